@@ -1,8 +1,13 @@
-from utils import EndianBinaryFileReader, EndianBinaryFileWriter
+from utils import EndianBinaryFileReader, EndianBinaryBufferWriter, RecordSchema, get_table_format, pop_option, pop_flag, TRACE, Progress, profile
 import os
+import json
+import hashlib
+import functools
 from pathlib import Path
 import sys
-import pandas as pd
+
+MANIFEST_FILENAME = "build_manifest.json" # hashes of the sources of every file built by batch_import, in the new lang folder
+STRING_POOL_NAME = "string_pool"
 
 SKIPSCRIPT = ["mm_c2_0400_660.bin", "mm_c2_0400_670.bin", "mm_c2_0400_680.bin",  #some script files have a different format (16 less bytes per entry) and may fail the export -> we skip those
               "mm_c2_0400_690.bin", "mm_c2_0400_700.bin", "mm_c2_0400_710.bin",
@@ -12,7 +17,70 @@ SKIPSCRIPT = ["mm_c2_0400_660.bin", "mm_c2_0400_670.bin", "mm_c2_0400_680.bin",
               "bt_0010.bin", "bt_0020.bin", "bt_0030.bin", "bt_0040.bin",
               ]
 
-class AkibaGametext:
+TASK_CHANGE_ENTRY = RecordSchema("TaskChangeRecord", [("string_offset", "i"), ("string_size", "i"), (None, "4x")])
+SCRIPT_ENTRY = RecordSchema("ScriptRecord", [("unk", "h"), ("type", "h"), ("param", "h"), (None, "26x"),
+                                             ("string_offset", "H"), (None, "6x"), # caption string for choices
+                                             ("choice1_string_offset", "H"), ("choice2_string_offset", "H"), ("choice3_string_offset", "H"), (None, "34x")])
+
+@functools.lru_cache(maxsize = None)
+def encode_string(string : str, terminator : str = '\x00') -> bytes:
+    # UTF-16 without BOM; cached because the same lines come back in many files
+    return (string + terminator).encode('utf-16')[2:]
+
+class StringBlob:
+    # encoded strings laid out one after the other. With share_strings, a string already in the blob
+    # is not written again and its first offset is reused
+    def __init__(self, share_strings : bool = False):
+        self.writer = EndianBinaryBufferWriter()
+        self.share_strings = share_strings
+        self.offsets : dict[bytes, int] = {}
+
+    def add(self, data : bytes) -> int:
+        if self.share_strings and data in self.offsets:
+            return self.offsets[data]
+        offset = self.writer.tell()
+        self.writer.write(data)
+        self.offsets.setdefault(data, offset)
+        return offset
+
+class TranslatableText:
+    # exports the strings of a text file to a translation table and loads the translations back.
+    # Subclasses provide table_folder, get_table and set_translations
+    table_folder = ""
+
+    def get_table_name(self) -> str:
+        return f"{self.table_folder}/{self.filename}"
+
+    def write_table(self, out_dir : str, table_format : str = "xlsx"):
+        columns, rows = self.get_table()
+        get_table_format(table_format).write(out_dir, self.get_table_name(), columns, rows)
+
+    def load_table(self, in_dir : str, table_format : str = "xlsx", string_pool : dict[str, str] = None):
+        # a line left untranslated in the file table gets its translation from the string pool, if any
+        translations = get_table_format(table_format).read(in_dir, self.get_table_name())
+        self.check_translations(translations) # before the pool is applied, which would drop extra rows
+        if string_pool:
+            columns, rows = self.get_table()
+            original_idx = columns.index("Original")
+            translations = [string_pool.get(row[original_idx], translation) if translation == row[original_idx] else translation
+                            for row, translation in zip(rows, translations)]
+        self.set_translations(translations)
+
+    def check_translations(self, translations : list[str]):
+        # a table with missing or extra rows would shift every string after it, or write a file which doesn't parse
+        expected = len(self.get_table()[1])
+        if len(translations) != expected:
+            raise Exception(f"{self.filename}: the translation table has {len(translations)} rows, expected {expected}")
+
+    def write_excel(self, out_dir):
+        self.write_table(out_dir, "xlsx")
+
+    def load_excel(self, excel_file : str):
+        self.set_translations(get_table_format("xlsx").read_file(excel_file))
+
+class AkibaGametext(TranslatableText):
+    table_folder = "gametext"
+
     def __init__(self, filepath : str):
         self.filename = os.path.basename(filepath)
         with EndianBinaryFileReader(filepath) as f:
@@ -26,89 +94,81 @@ class AkibaGametext:
                 assert "{" not in string
                 self.strings.append(string)
         
-    def write_excel(self, out_dir):
-        out_path = Path(out_dir) / "gametext" / (self.filename + '.xlsx')
+    def get_table(self) -> tuple[list[str], list[list[str]]]:
         data = [[string, string] for string in self.strings]
         columns = ["Original","Translation"]
-        df = pd.DataFrame(data=data, columns=columns)
-        df.to_excel(out_path)
+        return columns, data
 
-    def load_excel(self, excel_file : str):
-        df = pd.read_excel(excel_file, index_col = 0, dtype = str, na_filter=False)
-        self.strings = [str(data) for data in df["Translation"]]
+    def set_translations(self, translations : list[str]):
+        self.check_translations(translations)
+        self.strings = translations
 
-    def save(self, out_dir):
+    def save(self, out_dir, share_strings : bool = False):
         out_path = Path(out_dir) / "gametext" / self.filename
-        with EndianBinaryFileWriter(out_path) as f:
-            f.write_Int32(self.entry_count)
-            f.write_Int32(self.start_offset)
-            offset = 4 * self.entry_count
-            out_strings = [(string + '\x00').encode('utf-16')[2:] for string in self.strings]
-            for idx in range(self.entry_count):
-                f.write_Int32(offset)
-                offset += len(out_strings[idx])
-            for string in out_strings:
-                f.write(string)
-
-class AkibaTaskChange:
+        f = EndianBinaryBufferWriter()
+        strings = StringBlob(share_strings)
+        f.write_Int32(self.entry_count)
+        f.write_Int32(self.start_offset)
+        for string in self.strings:
+            f.write_Int32(4 * self.entry_count + strings.add(encode_string(string)))
+        f.write(strings.writer.buffer)
+        f.save(out_path)
+
+class AkibaTaskChange(TranslatableText):
+    table_folder = "gametext"
+
     def __init__(self, filepath : str):
         self.filename = os.path.basename(filepath)
         with EndianBinaryFileReader(filepath) as f:
             self.entry_count = f.read_Int32()
             padding = f.read(12)
-            self.entries = [TaskChangeEntry(f) for _ in range(self.entry_count)]
+            self.entries = [TaskChangeEntry(f, record) for record in f.read_records(TASK_CHANGE_ENTRY, self.entry_count)]
 
-    def write_excel(self, out_dir):
-        out_path = Path(out_dir) / "gametext" / (self.filename + '.xlsx')
+    def get_table(self) -> tuple[list[str], list[list[str]]]:
         data = [[entry.string, entry.string] for entry in self.entries]
         columns = ["Original","Translation"]
-        df = pd.DataFrame(data=data, columns=columns)
-        df.to_excel(out_path)
+        return columns, data
 
-    def load_excel(self, excel_file):
-        df = pd.read_excel(excel_file, index_col = 0, dtype = str, na_filter=False)
-        for idx, data in enumerate(df["Translation"]):
-            self.entries[idx].string = str(data)
+    def set_translations(self, translations : list[str]):
+        self.check_translations(translations)
+        for idx, data in enumerate(translations):
+            self.entries[idx].string = data
 
-    def save(self, out_dir : str):
+    def save(self, out_dir : str, share_strings : bool = False):
         out_path = Path(out_dir) / "gametext" / self.filename
-        with EndianBinaryFileWriter(out_path) as f:
-            f.write_Int32(self.entry_count)
-            f.write(b"\x00" * 12)
-            offset = self.entry_count * 12 + 0x10
-            for entry in self.entries:
-                string_offset = offset
-                entry.string_bytes = (entry.string + '\x00\x00').encode('utf-16')[2:]
-                string_size = len(entry.string_bytes)
-                f.write_Int32(string_offset)
-                f.write_Int32(string_size)
-                f.write_Int32(0)
-                offset += string_size
-            for entry in self.entries:
-                f.write(entry.string_bytes)
+        f = EndianBinaryBufferWriter()
+        strings = StringBlob(share_strings)
+        f.write_Int32(self.entry_count)
+        f.write(b"\x00" * 12)
+        for entry in self.entries:
+            entry.string_bytes = encode_string(entry.string, '\x00\x00')
+            string_offset = self.entry_count * TASK_CHANGE_ENTRY.size + 0x10 + strings.add(entry.string_bytes)
+            f.write_record(TASK_CHANGE_ENTRY, string_offset, len(entry.string_bytes))
+        f.write(strings.writer.buffer)
+        f.save(out_path)
 
 
 class TaskChangeEntry:
-    def __init__(self, f : EndianBinaryFileReader):
-        self.string_offset = f.read_Int32()
-        self.string_size = f.read_Int32()
-        padding = f.read_Int32()
-        pos = f.tell()
+    def __init__(self, f : EndianBinaryFileReader, record : tuple):
+        self.string_offset = record.string_offset
+        self.string_size = record.string_size
         f.seek(self.string_offset)
         self.string = f.read(self.string_size).decode('utf-16')[:-2]
-        f.seek(pos)
 
-class AkibaScript:
+class AkibaScript(TranslatableText):
+    table_folder = "script/talkevent"
+
     def __init__(self, filepath : str):
         self.filename = os.path.basename(filepath)
         with EndianBinaryFileReader(filepath) as f:
             padding = f.read(12)
             self.entry_count = f.read_Int32()
-            self.string_start_offset = 0x10 + self.entry_count * 0x50
-            self.entries = [ScriptEntry(f, self.string_start_offset) for _ in range(self.entry_count)]
+            self.string_start_offset = 0x10 + self.entry_count * SCRIPT_ENTRY.size
+            table = f.read(SCRIPT_ENTRY.size * self.entry_count)
+            self.entries = [ScriptEntry(f, table[idx * SCRIPT_ENTRY.size:(idx + 1) * SCRIPT_ENTRY.size], record, self.string_start_offset)
+                            for idx, record in enumerate(SCRIPT_ENTRY.iter_unpack(table, 0, self.entry_count))]
 
-    def write_excel(self, out_dir):
-        out_path = Path(out_dir) / "script" / "talkevent" / (self.filename + '.xlsx')
+    def get_table(self) -> tuple[list[str], list[list[str]]]:
         data = []
         for entry in self.entries:
             if entry.type == 1:
@@ -120,12 +180,11 @@ class AkibaScript:
                 data.append(["Choice 3", entry.choice3_string, entry.choice3_string])
 
         columns = ["Type", "Original","Translation"]
-        df = pd.DataFrame(data=data, columns=columns)
-        df.to_excel(out_path)
+        return columns, data
 
-    def load_excel(self, excel_file : str):
-        df = pd.read_excel(excel_file, index_col = 0, dtype = str, na_filter=False)
-        strings = iter([str(data) for data in df["Translation"]])
+    def set_translations(self, translations : list[str]):
+        self.check_translations(translations)
+        strings = iter(translations)
         for entry in self.entries:
             if entry.type == 1:
                 entry.string = next(strings)
@@ -135,74 +194,154 @@ class AkibaScript:
                 entry.choice2_string = next(strings)
                 entry.choice3_string = next(strings)
 
-    def save(self, out_dir : str):
+    def save(self, out_dir : str, share_strings : bool = False):
+        # the strings are laid out in their own buffer, so that their offsets are known before writing the entry table
         out_path = Path(out_dir) / "script" / "talkevent" / self.filename
-        with EndianBinaryFileWriter(out_path) as f:
-            f.write(b"\x00" * 12)
-            f.write_Int32(self.entry_count)
-            f.write(b"\x00" * 0x50 * self.entry_count)
-            for idx, entry in enumerate(self.entries):
-                pos = 0x10 + 0x50 * idx
-                f.seek(pos)
-                f.write(entry.bytedata)
-                if entry.type == 1:
-                    f.seek(0, 2)
-                    offset = f.tell() - self.string_start_offset
-                    f.write((entry.string + '\x00').encode('utf-16')[2:])
-                    f.seek(pos + 0x20)
-                    f.write_UInt16(offset)
-                elif entry.type == 2:
-                    f.seek(0, 2)
-                    caption_offset = f.tell() - self.string_start_offset
-                    f.write((entry.caption_string + '\x00').encode('utf-16')[2:])
-                    choice1_offset = f.tell() - self.string_start_offset
-                    f.write((entry.choice1_string + '\x00').encode('utf-16')[2:])
-                    choice2_offset = f.tell() - self.string_start_offset
-                    f.write((entry.choice2_string + '\x00').encode('utf-16')[2:])
-                    choice3_offset = f.tell() - self.string_start_offset
-                    f.write((entry.choice3_string + '\x00').encode('utf-16')[2:])
-                    f.seek(pos + 0x20)
-                    f.write_UInt16(caption_offset)
-                    f.seek(pos + 0x28)
-                    f.write_UInt16(choice1_offset)
-                    f.write_UInt16(choice2_offset)
-                    f.write_UInt16(choice3_offset)
+        f = EndianBinaryBufferWriter()
+        strings = StringBlob(share_strings)
+        f.write(b"\x00" * 12)
+        f.write_Int32(self.entry_count)
+        for entry in self.entries:
+            pos = f.tell()
+            f.write(entry.bytedata)
+            if entry.type == 1:
+                offset = strings.add(encode_string(entry.string))
+                f.seek(pos + 0x20)
+                f.write_UInt16(offset)
+            elif entry.type == 2:
+                caption_offset = strings.add(encode_string(entry.caption_string))
+                choice1_offset = strings.add(encode_string(entry.choice1_string))
+                choice2_offset = strings.add(encode_string(entry.choice2_string))
+                choice3_offset = strings.add(encode_string(entry.choice3_string))
+                f.seek(pos + 0x20)
+                f.write_UInt16(caption_offset)
+                f.seek(pos + 0x28)
+                f.write_UInt16(choice1_offset)
+                f.write_UInt16(choice2_offset)
+                f.write_UInt16(choice3_offset)
+            f.seek(pos + SCRIPT_ENTRY.size)
+        f.write(strings.writer.buffer)
+        f.save(out_path)
 
 class ScriptEntry:
-    def __init__(self, f : EndianBinaryFileReader, string_start_offset : int):
-        pos = f.tell()
-        self.bytedata = f.read(0x50)
-        f.seek(pos)
-        self.unk = f.read_Int16()
-        self.type = f.read_Int16()
-        self.param = f.read_Int16()
+    def __init__(self, f : EndianBinaryFileReader, bytedata : bytes, record : tuple, string_start_offset : int):
+        self.bytedata = bytedata
+        self.unk = record.unk
+        self.type = record.type
+        self.param = record.param
 
         if self.type == 1:
-            f.seek(pos + 0x20)
-            string_offset = f.read_UInt16()
-            f.seek(string_offset + string_start_offset)
+            f.seek(record.string_offset + string_start_offset)
             self.string = f.read_utf16_until_null()
 
         elif self.type == 2:
-            f.seek(pos + 0x20)
-            caption_offset = f.read_UInt16()
-            f.seek(pos + 0x28)
-            choice1_string_offset = f.read_UInt16()
-            choice2_string_offset = f.read_UInt16()
-            choice3_string_offset = f.read_UInt16()
-            f.seek(caption_offset + string_start_offset)
+            f.seek(record.string_offset + string_start_offset)
             self.caption_string = f.read_utf16_until_null()
-            f.seek(choice1_string_offset + string_start_offset)
+            f.seek(record.choice1_string_offset + string_start_offset)
             self.choice1_string = f.read_utf16_until_null()
-            f.seek(choice2_string_offset + string_start_offset)
+            f.seek(record.choice2_string_offset + string_start_offset)
             self.choice2_string = f.read_utf16_until_null()
-            f.seek(choice3_string_offset + string_start_offset)
+            f.seek(record.choice3_string_offset + string_start_offset)
             self.choice3_string = f.read_utf16_until_null()
 
-        f.seek(pos + 0x50)
 
+class StringPool:
+    # translation memory of a whole lang folder: every line occurring more than once across the text files
+    # is listed a single time with the places where it occurs, so that it only has to be translated once
+    def __init__(self):
+        self.occurrences : dict[str, list[str]] = {}
+
+    def add(self, name : str, columns : list[str], rows : list[list[str]]):
+        original_idx = columns.index("Original")
+        for idx, row in enumerate(rows):
+            if row[original_idx]:
+                self.occurrences.setdefault(row[original_idx], []).append(f"{name}:{idx}")
 
-def batch_export(in_dir, out_dir):
+    def write_table(self, out_dir : str, table_format : str = "xlsx"):
+        data = []
+        for original, occurrences in self.occurrences.items():
+            if len(occurrences) > 1:
+                string_hash = hashlib.sha1(original.encode('utf-8')).hexdigest()[:12]
+                data.append([string_hash, str(len(occurrences)), " ".join(occurrences), original, original])
+        columns = ["Hash", "Count", "Occurrences", "Original", "Translation"]
+        get_table_format(table_format).write(out_dir, STRING_POOL_NAME, columns, data)
+
+def load_string_pool(table_dir : str, table_format : str) -> dict[str, str]:
+    # original -> translation for the translated lines of the pool
+    table = get_table_format(table_format)
+    originals = table.read(table_dir, STRING_POOL_NAME, "Original")
+    translations = table.read(table_dir, STRING_POOL_NAME, "Translation")
+    return {original : translation for original, translation in zip(originals, translations) if translation != original}
+
+def export_file(text_class : type, path : str, out_dir : str, table_format : str) -> tuple[str, list[str], list[list[str]]]:
+    with TRACE.phase("parse", os.path.getsize(path)):
+        text = text_class(path)
+    with TRACE.phase(table_format):
+        text.write_table(out_dir, table_format)
+    return (text.get_table_name(), *text.get_table())
+
+def import_file(text_class : type, path : str, table_dir : str, new_dir : str, table_format : str, string_pool : dict[str, str] = None, share_strings : bool = False):
+    with TRACE.phase("parse", os.path.getsize(path)):
+        text = text_class(path)
+    with TRACE.phase(table_format):
+        text.load_table(table_dir, table_format, string_pool)
+    with TRACE.phase("write"):
+        text.save(new_dir, share_strings)
+
+def run_traced(record_events : bool, func, *args) -> tuple:
+    # runs a task in a worker process, and sends its phase timings back along with its result
+    TRACE.record_events = record_events
+    TRACE.collect()
+    result = func(*args)
+    return result, TRACE.collect()
+
+def file_size(path) -> int:
+    # for the progress only: a missing file is reported by its own task
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def run_tasks(action : str, tasks : list[tuple], jobs : int = 1, verbose : bool = False) -> tuple[dict, list[tuple[str, str]]]:
+    # tasks are (path, function, args) tuples, run in a pool of processes when jobs > 1.
+    # A failing file doesn't abort the batch: errors are reported all together at the end.
+    # Returns the results of the successful tasks by path, and the errors
+    results = {}
+    errors = []
+    progress = Progress(action, len(tasks), sum(file_size(path) for path, _, _ in tasks), verbose = verbose)
+    def report(path, error : Exception, result = None):
+        if error is None:
+            results[str(path)] = result
+            progress.update(file_size(path), item = path)
+        else:
+            progress.print(f"Failed to {action.lower()} {path}: {error!r}")
+            progress.update(file_size(path), 0)
+            errors.append((str(path), repr(error)))
+
+    if jobs == 1:
+        for path, func, args in tasks:
+            try:
+                report(path, None, func(*args))
+            except Exception as e:
+                report(path, e)
+    else:
+        from concurrent.futures import ProcessPoolExecutor, as_completed # multiprocessing is slow to import, only pay for it when needed
+        with ProcessPoolExecutor(max_workers = jobs) as executor:
+            futures = {executor.submit(run_traced, TRACE.record_events, func, *args) : path for path, func, args in tasks}
+            for future in as_completed(futures):
+                error = future.exception()
+                result = None
+                if error is None:
+                    result, timings = future.result()
+                    TRACE.merge(*timings)
+                report(futures[future], error, result)
+
+    progress.close()
+    for path, error in errors:
+        print(f"  {path}: {error}")
+    return results, errors
+
+def batch_export(in_dir, out_dir, jobs : int = 1, table_format : str = "xlsx", use_pool : bool = False, verbose : bool = False) -> list[tuple[str, str]]:
     if not (Path(out_dir) / "gametext").exists():
         os.makedirs(Path(out_dir) / "gametext")
 
@@ -210,58 +349,106 @@ def batch_export(in_dir, out_dir):
         os.makedirs(Path(out_dir) / "script" / "talkevent")
 
     gametext_path = Path(in_dir) / "gametext" / "gametext.bin"
-    print("Exporting gametext.bin...")
-    gametext = AkibaGametext(gametext_path)
-    gametext.write_excel(out_dir)
-
     tasktext_path = Path(in_dir) / "gametext" / "TaskChangeText.bin"
-    print("Exporting TaskChangeText.bin...")
-    tasktext = AkibaTaskChange(tasktext_path)
-    tasktext.write_excel(out_dir)
+    tasks = [(gametext_path, export_file, (AkibaGametext, gametext_path, out_dir, table_format)),
+             (tasktext_path, export_file, (AkibaTaskChange, tasktext_path, out_dir, table_format))]
 
     for path in (Path(in_dir) / "script" / "talkevent").iterdir():
         if path.name in SKIPSCRIPT:
             continue
-        print(f"Exporting {path}...")
-        script = AkibaScript(path)
-        script.write_excel(out_dir)
-
-def batch_import(base_dir, modded_dir, new_dir):
+        tasks.append((path, export_file, (AkibaScript, path, out_dir, table_format)))
+    results, errors = run_tasks("Export", tasks, jobs, verbose)
+
+    if use_pool:
+        with TRACE.phase("pool"):
+            string_pool = StringPool()
+            for name, columns, rows in sorted(results.values()):
+                string_pool.add(name, columns, rows)
+            string_pool.write_table(out_dir, table_format)
+    return errors
+
+def hash_file(filepath : str) -> str:
+    with open(filepath, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def batch_import(base_dir, modded_dir, new_dir, jobs : int = 1, table_format : str = "xlsx", force : bool = False,
+                 use_pool : bool = False, share_strings : bool = False, verbose : bool = False) -> list[tuple[str, str]]:
+    # only rebuilds the files whose original .bin or translation table changed since the last import to new_dir
     if not (Path(new_dir) / "gametext").exists():
         os.makedirs(Path(new_dir) / "gametext")
 
     if not (Path(new_dir) / "script" / "talkevent").exists():
         os.makedirs(Path(new_dir) / "script" / "talkevent")
 
-    gametext_path = Path(base_dir) / "gametext" / "gametext.bin"
-    print("Importing gametext.bin...")
-    gametext = AkibaGametext(gametext_path)
-    gametext.load_excel(Path(modded_dir) / "gametext" / "gametext.bin.xlsx")
-    gametext.save(new_dir)
-
-    tasktext_path = Path(base_dir) / "gametext" / "TaskChangeText.bin"
-    print("Importing TaskChangeText.bin...")
-    tasktext = AkibaTaskChange(tasktext_path)
-    tasktext.load_excel(Path(modded_dir) / "gametext" / "TaskChangeText.bin.xlsx")
-    tasktext.save(new_dir)
-
+    table = get_table_format(table_format)
+    text_files = [(AkibaGametext, Path(base_dir) / "gametext" / "gametext.bin"),
+                  (AkibaTaskChange, Path(base_dir) / "gametext" / "TaskChangeText.bin")]
     for path in (Path(base_dir) / "script" / "talkevent").iterdir():
         if path.name in SKIPSCRIPT:
             continue
-        excel_path = Path(modded_dir) / "script" / "talkevent" / f"{path.name}.xlsx"
-        if excel_path.exists():
-            print(f"Importing {path}...")
-            script = AkibaScript(path)
-            script.load_excel(Path(modded_dir) / "script" / "talkevent" / f"{path.name}.xlsx")
-            script.save(new_dir)
+        if table.exists(modded_dir, f"{AkibaScript.table_folder}/{path.name}"):
+            text_files.append((AkibaScript, path))
+
+    manifest_path = Path(new_dir) / MANIFEST_FILENAME
+    manifest = {}
+    if manifest_path.is_file() and not force:
+        with open(manifest_path, 'r', encoding = 'utf-8') as f:
+            manifest = json.load(f)
+
+    tasks = []
+    fingerprints = {}
+    pool_fingerprint = table.fingerprint(modded_dir, STRING_POOL_NAME) if use_pool else None
+    string_pool = load_string_pool(modded_dir, table_format) if use_pool else None # loaded once, and sent to every task
+    for text_class, path in text_files:
+        name = f"{text_class.table_folder}/{path.name}"
+        try:
+            with TRACE.phase("hash"):
+                fingerprint = {"source" : hash_file(path), "translation" : table.fingerprint(modded_dir, name), "format" : table_format,
+                               "pool" : pool_fingerprint, "share_strings" : share_strings}
+        except OSError:
+            fingerprint = None # the import of the file fails in its task, which reports the error like any other
+        if fingerprint is not None and manifest.get(name) == fingerprint and (Path(new_dir) / name).is_file():
+            continue
+        fingerprints[str(path)] = (name, fingerprint)
+        tasks.append((path, import_file, (text_class, path, modded_dir, new_dir, table_format, string_pool, share_strings)))
+    print(f"Skipping {len(text_files) - len(tasks)} unchanged files")
+    results, errors = run_tasks("Import", tasks, jobs, verbose)
+
+    failed = {path for path, _ in errors}
+    for path, (name, fingerprint) in fingerprints.items():
+        if path in failed or fingerprint is None:
+            manifest.pop(name, None)
+        else:
+            manifest[name] = fingerprint
+    with open(manifest_path, 'w', encoding = 'utf-8') as f:
+        json.dump(manifest, f, indent = 0)
+    return errors
 
 def main():
     args = sys.argv
-    if "-e" in args:
-        batch_export(args[2], args[3])
-    
-    elif "-i" in args:
-        batch_import(args[2], args[3], args[4])
+    jobs = int(pop_option(args, "--jobs", 1))
+    table_format = pop_option(args, "--format", "xlsx")
+    force = pop_flag(args, "--force")
+    use_pool = pop_flag(args, "--pool")
+    share_strings = pop_flag(args, "--share-strings")
+    verbose = pop_flag(args, "--verbose")
+    trace_path = pop_option(args, "--trace")
+    profiling = pop_flag(args, "--profile")
+    TRACE.record_events = trace_path is not None
+    errors = []
+    with profile(profiling):
+        if "-e" in args:
+            errors = batch_export(args[2], args[3], jobs, table_format, use_pool, verbose)
+
+        elif "-i" in args:
+            errors = batch_import(args[2], args[3], args[4], jobs, table_format, force, use_pool, share_strings, verbose)
+
+    if trace_path is not None:
+        TRACE.save(trace_path)
+    if trace_path is not None or profiling:
+        print(TRACE.summary())
+    if errors:
+        sys.exit(1)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,37 +1,168 @@
-from utils import EndianBinaryFileReader, EndianBinaryFileWriter, try_create_dir_from_filepath
+from utils import EndianBinaryFileReader, EndianBinaryFileWriter, EndianBinaryBufferWriter, BuildCache, RecordSchema, create_dirs_from_filepaths, pop_option, pop_flag, ordered_imap, copy_file_data, TRACE, Progress, profile, Compressor, DEFAULT_COMPRESSOR
+import os
 import zlib
+import hashlib
+import json
+import io
+from fnmatch import fnmatchcase
+import mmap
+import struct
+import functools
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import sys
 
+VOLUME_HEADER = RecordSchema("VolumeHeader", [("magic", "4s"), ("entry_count1", "I"), ("entry_count2", "I"), ("data_start_offset", "I"), ("datasize", "I")], 'big')
+VOLUME_ENTRY = RecordSchema("VolumeEntryRecord", [("unk_offset", "I"), ("data_offset", "I"), ("decompressed_data_size", "I"),
+                                                  ("compression_flag", "I"), ("path_offset", "I"), ("unk", "I")], 'big')
+JOURNAL_MAGIC = b"VJNL"
+JOURNAL_END = b"DONE"
+UINT32 = 'I' if array('I').itemsize == 4 else 'L'
+
 class Volume:
     def __init__(self, filepath : str):
         self.filepath = filepath
-        with EndianBinaryFileReader(filepath, endianness = 'big') as f:
-            self.magic = f.read(4)
+        with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as mm, TRACE.phase("parse"):
+            self.magic, self.entry_count1, self.entry_count2, self.data_start_offset, self.datasize = VOLUME_HEADER.unpack_from(mm)
+            # datasize takes into account an hypothetical padding of the last file which doesn't exist in reality
             assert self.magic == b"\xFA\xDE\xBA\xBE", "Invalid magic"
-            self.entry_count1 = f.read_UInt32()
-            self.entry_count2 = f.read_UInt32()
-            self.data_start_offset = f.read_UInt32()
-            self.datasize = f.read_UInt32() # it takes into account an hypothetical padding of the last file which doesn't exist in reality
             assert self.entry_count1 == self.entry_count2
-            self.entries = [VolumeEntry(f, self.data_start_offset) for _ in range(self.entry_count1)]
-
-    def unpack(self, root_dir : str):
-        with EndianBinaryFileReader(self.filepath, endianness = 'big') as f:
-            for entry in self.entries:
-                print(f"Extracting {entry.path}...")
-                f.seek(entry.data_offset)
-                data = f.read(entry.path_offset - entry.data_offset)
-                if entry.compression_flag == 0:
-                    pass
-                elif entry.compression_flag == 8:
-                    data = zlib.decompress(data)
-                else:
-                    raise Exception(f"Unsupported compression flag: {entry.compression_flag}")
-                try_create_dir_from_filepath(Path(root_dir) / entry.path)
-                open(Path(root_dir) / entry.path, 'wb').write(data)
+            self.entries = VolumeEntryTable(mm, self.data_start_offset, self.entry_count1)
+        self.checksums : dict[str, str] = {} # SHA-1 of the decompressed data of each entry, filled by unpack or on demand
+
+    @functools.cached_property
+    def index(self) -> dict[str, 'VolumeEntry']:
+        # built on first use: extracting and importing don't need it
+        return {entry.path : entry for entry in self.entries}
+
+    def get_fingerprint(self) -> list[int]:
+        # size and modification time of the archive: saved checksums are only trusted for the archive they were computed on
+        stat = os.stat(self.filepath)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def load_checksums(self, filepath : str):
+        # each checksum is also tied to the data offset and size of its entry, which change when the file is patched
+        with open(filepath, 'r', encoding = 'utf-8') as f:
+            saved = json.load(f)
+        if not isinstance(saved, dict) or saved.get("archive") != self.get_fingerprint():
+            print(f"Ignoring {filepath}: it was saved for another version of {self.filepath}")
+            return
+        for path, (data_offset, decompressed_size, checksum) in saved["files"].items():
+            entry = self.index.get(path)
+            if entry is not None and entry.data_offset == data_offset and entry.decompressed_data_size == decompressed_size:
+                self.checksums[path] = checksum
+
+    def save_checksums(self, filepath : str):
+        files = {path : [self.index[path].data_offset, self.index[path].decompressed_data_size, checksum] for path, checksum in self.checksums.items()}
+        with open(filepath, 'w', encoding = 'utf-8') as f:
+            json.dump({"archive" : self.get_fingerprint(), "files" : files}, f, indent = 0)
+
+    def decompress(self, entry : 'VolumeEntry', data : bytes) -> bytes:
+        if entry.compression_flag == 0:
+            return data
+        elif entry.compression_flag == 8:
+            return zlib.decompress(data)
+        else:
+            raise Exception(f"Unsupported compression flag: {entry.compression_flag}")
+
+    def read_entry(self, entry : 'VolumeEntry') -> bytes:
+        with open(self.filepath, 'rb') as f:
+            f.seek(entry.data_offset)
+            return self.decompress(entry, f.read(entry.path_offset - entry.data_offset))
+
+    def read(self, path : str) -> bytes:
+        return self.read_entry(self.index[path])
+
+    def open(self, path : str) -> io.BufferedReader:
+        # streams the decompressed data of a single file, without loading it whole in memory
+        return io.BufferedReader(VolumeEntryReader(self.filepath, self.index[path]))
+
+    def glob(self, patterns : list[str]) -> list['VolumeEntry']:
+        # fnmatch patterns, where '*' also matches '/': "lang_us/*" selects the whole lang_us folder
+        return [entry for entry in self.entries if any(fnmatchcase(entry.path, pattern) for pattern in patterns)]
+
+    def stream_checksum(self, entry : 'VolumeEntry') -> tuple[str, int]:
+        # SHA-1 and size of the decompressed data, read chunk by chunk
+        checksum = hashlib.sha1()
+        size = 0
+        with VolumeEntryReader(self.filepath, entry) as fr:
+            while chunk := fr.read(fr.chunk_size):
+                checksum.update(chunk)
+                size += len(chunk)
+        return checksum.hexdigest(), size
+
+    def get_checksum(self, entry : 'VolumeEntry') -> str:
+        if entry.path not in self.checksums:
+            self.checksums[entry.path] = self.stream_checksum(entry)[0]
+        return self.checksums[entry.path]
+
+    def is_modified(self, root_dir : str, entry : 'VolumeEntry') -> bool:
+        # a file identical to the original entry is not considered as modified, so its original data gets reused as is
+        fpath = Path(root_dir) / entry.path
+        if not fpath.is_file():
+            return False
+        if os.path.getsize(fpath) != entry.decompressed_data_size:
+            return True
+        with open(fpath, 'rb') as f, TRACE.phase("compare", entry.decompressed_data_size):
+            return hashlib.sha1(f.read()).hexdigest() != self.get_checksum(entry)
+
+    def unpack(self, root_dir : str, jobs : int = 1, patterns : list[str] = None, stream_threshold : int = 0x400000, verbose : bool = False):
+        # zlib releases the GIL, so threads are enough to decompress and write in parallel.
+        # Files larger than stream_threshold are decompressed chunk by chunk, which bounds the memory used by each thread
+        entries = self.entries if patterns is None else self.glob(patterns)
+        entries = sorted(entries, key = lambda entry: entry.data_offset)
+        create_dirs_from_filepaths([Path(root_dir) / entry.path for entry in entries])
+        with open(self.filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as mm:
+            def extract(entry : VolumeEntry) -> tuple[VolumeEntry, str]:
+                with open(Path(root_dir) / entry.path, 'wb') as fw:
+                    if entry.decompressed_data_size > stream_threshold:
+                        checksum = hashlib.sha1()
+                        with VolumeEntryReader(self.filepath, entry) as fr, TRACE.phase("stream", entry.decompressed_data_size):
+                            while chunk := fr.read(fr.chunk_size):
+                                checksum.update(chunk)
+                                fw.write(chunk)
+                        return entry, checksum.hexdigest()
+                    with TRACE.phase("decompress", entry.decompressed_data_size):
+                        data = self.decompress(entry, mm[entry.data_offset:entry.path_offset])
+                    with TRACE.phase("write", len(data)):
+                        fw.write(data)
+                with TRACE.phase("checksum", len(data)):
+                    return entry, hashlib.sha1(data).hexdigest()
+
+            total_size = sum(entry.decompressed_data_size for entry in entries)
+            with ThreadPoolExecutor(max_workers = jobs) as executor, Progress("Extract", len(entries), total_size, verbose = verbose) as progress:
+                for entry, checksum in executor.map(extract, entries):
+                    self.checksums[entry.path] = checksum
+                    progress.update(entry.decompressed_data_size, item = entry.path)
+
+    def load_file(self, root_dir : str, entry : 'VolumeEntry', cache : BuildCache = None, compressor : Compressor = DEFAULT_COMPRESSOR) -> tuple[bytes, int]:
+        fpath = Path(root_dir) / entry.path
+        if entry.compression_flag == 8 and cache is not None:
+            with TRACE.phase("cache", entry.decompressed_data_size):
+                return cache.load(fpath, compressor.variant, compressor)
+        with open(fpath, 'rb') as f, TRACE.phase("read"):
+            data = f.read()
+        decompressed_size = len(data)
+        if entry.compression_flag == 0:
+            pass
+        elif entry.compression_flag == 8:
+            with TRACE.phase("compress", decompressed_size):
+                data = compressor(data)
+        else:
+            raise Exception(f"Unsupported compression flag: {entry.compression_flag}")
+        return data, decompressed_size
 
-    def import_files(self, root_dir : str, volume_path : str):
+    def import_files(self, root_dir : str, volume_path : str, jobs : int = 1, cache : BuildCache = None,
+                     compressor : Compressor = DEFAULT_COMPRESSOR, verbose : bool = False):
+        # modified files are read and compressed by a pool of threads, while this thread writes them in entry order
+        def load_file(entry : VolumeEntry):
+            return self.load_file(root_dir, entry, cache, compressor)
+
+        with ThreadPoolExecutor(max_workers = jobs) as executor:
+            modified = list(executor.map(lambda entry: self.is_modified(root_dir, entry), self.entries))
+        table = EndianBinaryBufferWriter(endianness = 'big') # written over the zeroed table once every entry is placed
         with EndianBinaryFileWriter(volume_path, endianness = 'big') as fw:
             fw.write(self.magic)
             fw.write_UInt32(self.entry_count1)
@@ -39,68 +170,486 @@ class Volume:
             fw.write_UInt32(self.data_start_offset)
             fw.write_UInt32(0)
             fw.pad(self.data_start_offset)
-            with EndianBinaryFileReader(self.filepath, endianness = 'big') as fr:
-                for idx, entry in enumerate(self.entries):
-                    print(f'Importing {entry.path}')
-                    fpath = Path(root_dir) / entry.path
-
-                    if fpath.is_file():
-                        data = open(fpath, 'rb').read()
-                        decompressed_size = len(data)
-                        if entry.compression_flag == 0:
-                            pass
-                        elif entry.compression_flag == 8:
-                            data = zlib.compress(data)
-                        else:
-                            raise Exception(f"Unsupported compression flag: {entry.compression_flag}")
+            with open(self.filepath, 'rb') as fr, ThreadPoolExecutor(max_workers = jobs) as executor, \
+                 Progress("Import", len(self.entries), self.datasize, verbose = verbose) as progress:
+                modified_entries = [entry for entry, is_modified in zip(self.entries, modified) if is_modified]
+                loaded_files = ordered_imap(executor, load_file, modified_entries, 4 * jobs)
+                idx = 0
+                while idx < len(self.entries):
+                    entry = self.entries[idx]
+                    if modified[idx]:
+                        data, decompressed_size = next(loaded_files)
+                        data_offset = fw.tell()
+                        with TRACE.phase("write", len(data)):
+                            fw.write(data)
+                            self.write_entry_path(fw, table, idx, entry, data_offset, decompressed_size)
+                        progress.update(fw.tell() - data_offset, item = entry.path)
+                        idx += 1
+                        continue
 
+                    # unmodified entries are copied straight from the original file, a whole run at once when
+                    # their slots are contiguous and keep the same 0x800 alignment in the new file
+                    run_end = idx + 1
+                    while run_end < len(self.entries) and not modified[run_end] and self.entries[run_end].data_offset == self.entries[run_end - 1].slot_end():
+                        run_end += 1
+                    shift = fw.tell() - entry.data_offset
+                    if shift % 0x800 == 0:
+                        run_size = self.entries[run_end - 1].slot_end() - entry.data_offset
+                        with TRACE.phase("copy", run_size):
+                            copy_file_data(fr, fw.file, entry.data_offset, run_size)
+                        for run_idx in range(idx, run_end):
+                            run_entry = self.entries[run_idx]
+                            self.write_table_row(table, run_idx, run_entry, run_entry.data_offset + shift, run_entry.decompressed_data_size, run_entry.path_offset + shift)
+                            progress.update(run_entry.slot_end() - run_entry.data_offset, item = run_entry.path)
+                        idx = run_end
                     else:
-                        fr.seek(entry.data_offset)
-                        data = fr.read(entry.path_offset - entry.data_offset)
-                        decompressed_size = entry.decompressed_data_size
-
-                    data_offset = fw.tell() - self.data_start_offset
-                    fw.write(data)
-                    path_offset = fw.tell() - self.data_start_offset
-                    fw.write(entry.path.encode('utf-8'))
-                    if fw.tell() % 0x800 == 0:
-                        fw.write(b'\x00' * 800)
-                    else:
-                        fw.pad(0x800)
-                    pos = fw.tell()
-                    fw.seek((0x18 * idx) + 0x14)
-                    fw.write_UInt32(entry.unk_offset)
-                    fw.write_UInt32(data_offset)
-                    fw.write_UInt32(decompressed_size)
-                    fw.write_UInt32(entry.compression_flag)
-                    fw.write_UInt32(path_offset)
-                    fw.write_UInt32(entry.unk)
-                    fw.seek(pos)
+                        data_offset = fw.tell()
+                        with TRACE.phase("copy", entry.path_offset - entry.data_offset):
+                            copy_file_data(fr, fw.file, entry.data_offset, entry.path_offset - entry.data_offset)
+                            self.write_entry_path(fw, table, idx, entry, data_offset, entry.decompressed_data_size)
+                        progress.update(fw.tell() - data_offset, item = entry.path)
+                        idx += 1
+
+                pos = fw.tell()
                 fw.seek(0x10)
                 fw.write_UInt32(pos - self.data_start_offset) # datasize
+                fw.write(table.buffer)
+
+    def write_entry_path(self, fw : EndianBinaryFileWriter, table : EndianBinaryBufferWriter, idx : int, entry : 'VolumeEntry', data_offset : int, decompressed_size : int):
+        path_offset = fw.tell()
+        fw.write(entry.path.encode('utf-8'))
+        if fw.tell() % 0x800 == 0:
+            fw.write(b'\x00' * 800)
+        else:
+            fw.pad(0x800)
+        self.write_table_row(table, idx, entry, data_offset, decompressed_size, path_offset)
+
+    def write_table_row(self, table : EndianBinaryBufferWriter, idx : int, entry : 'VolumeEntry', data_offset : int, decompressed_size : int, path_offset : int):
+        table.seek(VOLUME_ENTRY.size * idx)
+        table.write_record(VOLUME_ENTRY, entry.unk_offset, data_offset - self.data_start_offset, decompressed_size,
+                           entry.compression_flag, path_offset - self.data_start_offset, entry.unk)
+
+    def patch_files(self, root_dir : str, jobs : int = 1, cache : BuildCache = None, compressor : Compressor = DEFAULT_COMPRESSOR, verbose : bool = False):
+        # modifies the volume in place: a file which still fits in its original 0x800-aligned slot is overwritten there,
+        # otherwise it is appended at the end of the data region. The original bytes are saved in a journal first,
+        # so that an interrupted patch can be undone with Volume.rollback
+        journal_path = self.filepath + '.journal'
+        assert not os.path.exists(journal_path), f"Found an interrupted patch, roll it back first: {journal_path}"
+        with ThreadPoolExecutor(max_workers = jobs) as executor:
+            modified_flags = executor.map(lambda entry: self.is_modified(root_dir, entry), self.entries)
+            modified = [(idx, entry) for idx, (entry, is_modified) in enumerate(zip(self.entries, modified_flags)) if is_modified]
+            loaded_files = list(executor.map(lambda item: self.load_file(root_dir, item[1], cache, compressor), modified))
+
+        writes = []
+        updated_entries = []
+        data_end = self.data_start_offset + self.datasize
+        offsets = sorted(self.entries.data_offset) # relative to the data start offset
+        for (idx, entry), (data, decompressed_size) in zip(modified, loaded_files):
+            slot = data + entry.path.encode('utf-8')
+            # the slot can't grow past the next file, whatever the padding of the archive. Files sharing their data can't be patched in place
+            offset = entry.data_offset - self.data_start_offset
+            next_idx = bisect_right(offsets, offset)
+            if next_idx - bisect_left(offsets, offset) > 1:
+                slot_end = entry.data_offset
+            else:
+                slot_end = min(entry.slot_end(), offsets[next_idx] + self.data_start_offset if next_idx < len(offsets) else data_end)
+            if len(slot) < slot_end - entry.data_offset:
+                data_offset = entry.data_offset
+                slot += bytes(slot_end - data_offset - len(slot))
+            else:
+                data_offset = data_end + (-data_end % 0x800)
+                if (data_offset + len(slot)) % 0x800 == 0:
+                    slot += b'\x00' * 800
+                else:
+                    slot += bytes(0x800 - (data_offset + len(slot)) % 0x800)
+                data_end = data_offset + len(slot)
+            path_offset = data_offset + len(data)
+            writes.append((data_offset, slot))
+            writes.append((VOLUME_HEADER.size + VOLUME_ENTRY.size * idx, VOLUME_ENTRY.pack(entry.unk_offset, data_offset - self.data_start_offset,
+                decompressed_size, entry.compression_flag, path_offset - self.data_start_offset, entry.unk)))
+            updated_entries.append((entry, data_offset, decompressed_size, path_offset))
+        writes.append((0x10, struct.pack('>I', data_end - self.data_start_offset))) # datasize
+
+        with TRACE.phase("journal"):
+            self.write_journal(journal_path, writes)
+        with open(self.filepath, 'r+b') as f, Progress("Patch", len(modified), sum(len(data) for _, data in writes), verbose = verbose) as progress:
+            for write_idx, (offset, data) in enumerate(writes):
+                with TRACE.phase("write", len(data)):
+                    f.seek(offset)
+                    f.write(data)
+                # the writes are the slot and table row of each file, then the datasize
+                is_slot = write_idx % 2 == 0 and write_idx < 2 * len(modified)
+                progress.update(len(data), int(is_slot), modified[write_idx // 2][1].path if is_slot else None)
+            with TRACE.phase("sync"):
+                f.flush()
+                os.fsync(f.fileno())
+        os.remove(journal_path)
+
+        for entry, data_offset, decompressed_size, path_offset in updated_entries:
+            entry.data_offset = data_offset
+            entry.decompressed_data_size = decompressed_size
+            entry.path_offset = path_offset
+            self.checksums.pop(entry.path, None) # computed again from the new data when needed
+        self.datasize = data_end - self.data_start_offset
+
+    def verify(self, jobs : int = 1) -> list[str]:
+        # checks the entry table against the layout written by import_files, then decompresses every compressed file
+        # (by several threads, chunk by chunk) to check its size. Returns the problems found
+        problems = []
+        file_size = os.path.getsize(self.filepath)
+        table_end = VOLUME_HEADER.size + VOLUME_ENTRY.size * self.entry_count1
+        if self.data_start_offset < table_end:
+            problems.append(f"Data start offset {self.data_start_offset:#x} is inside the entry table, which ends at {table_end:#x}")
+        if self.data_start_offset % 0x800 != 0:
+            problems.append(f"Data start offset {self.data_start_offset:#x} isn't aligned to 0x800")
+
+        compressed_entries = []
+        paths = set()
+        previous = None
+        data_end = self.data_start_offset
+        for entry in sorted(self.entries, key = lambda entry: entry.data_offset):
+            path_end = entry.path_offset + len(entry.path.encode('utf-8'))
+            if entry.path in paths:
+                problems.append(f"{entry.path}: duplicate path")
+            paths.add(entry.path)
+            # import_files writes each slot right after the previous one. A slot whose path ends on a 0x800 boundary is padded
+            # with 800 bytes, so a gap (the old slot of a file moved by patch_files) ends either on a boundary or 800 bytes after one
+            if (previous is None or entry.data_offset != previous.slot_end()) and entry.data_offset % 0x800 not in (0, 800):
+                problems.append(f"{entry.path}: data offset {entry.data_offset:#x} neither follows the previous slot nor starts a new one")
+            if previous is not None and entry.data_offset < data_end:
+                problems.append(f"{entry.path}: data at {entry.data_offset:#x} overlaps {previous.path}, which ends at {data_end:#x}")
+            if entry.path_offset < entry.data_offset:
+                problems.append(f"{entry.path}: path offset {entry.path_offset:#x} is before data offset {entry.data_offset:#x}")
+                continue
+            if path_end > file_size:
+                problems.append(f"{entry.path}: ends at {path_end:#x}, after the end of the file at {file_size:#x}")
+                continue
+            previous = entry
+            data_end = path_end
+            if entry.compression_flag == 0:
+                if entry.path_offset - entry.data_offset != entry.decompressed_data_size:
+                    problems.append(f"{entry.path}: stored size {entry.path_offset - entry.data_offset} doesn't match size {entry.decompressed_data_size}")
+            elif entry.compression_flag == 8:
+                compressed_entries.append(entry)
+            else:
+                problems.append(f"{entry.path}: unsupported compression flag {entry.compression_flag}")
+
+        # datasize counts the padding of the last slot, which may be missing from the file
+        if previous is not None and not data_end <= self.data_start_offset + self.datasize <= previous.slot_end():
+            problems.append(f"Datasize {self.datasize:#x} doesn't match the end of the last file, {data_end - self.data_start_offset:#x}")
+
+        def check(entry : VolumeEntry) -> tuple[VolumeEntry, str]:
+            try:
+                checksum, size = self.stream_checksum(entry)
+            except Exception as e:
+                return entry, f"{entry.path}: failed to decompress: {e!r}"
+            self.checksums[entry.path] = checksum
+            if size != entry.decompressed_data_size:
+                return entry, f"{entry.path}: decompressed to {size} bytes instead of {entry.decompressed_data_size}"
+            return entry, None
+
+        total_size = sum(entry.decompressed_data_size for entry in compressed_entries)
+        with ThreadPoolExecutor(max_workers = jobs) as executor, Progress("Check", len(compressed_entries), total_size) as progress:
+            for entry, problem in executor.map(check, compressed_entries):
+                if problem is not None:
+                    problems.append(problem)
+                progress.update(entry.decompressed_data_size)
+        return problems
+
+    def diff(self, other : 'Volume', jobs : int = 1) -> tuple[list[str], list[str], list[str], list[tuple[str, str]]]:
+        # compares the files of two archives without extracting them. Files with the same raw data are equal, the others
+        # are compared by the SHA-1 of their decompressed data. Returns the removed, added and modified paths, and the files
+        # which couldn't be read with the error
+        removed = [entry.path for entry in self.entries if entry.path not in other.index]
+        added = [entry.path for entry in other.entries if entry.path not in self.index]
+        common = [entry.path for entry in self.entries if entry.path in other.index]
+        with open(self.filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as mm, \
+             open(other.filepath, 'rb') as other_f, mmap.mmap(other_f.fileno(), 0, access = mmap.ACCESS_READ) as other_mm:
+            def compare(path : str) -> tuple[str, bool, str]:
+                entry, other_entry = self.index[path], other.index[path]
+                if entry.decompressed_data_size != other_entry.decompressed_data_size:
+                    return path, True, None
+                if entry.compression_flag == other_entry.compression_flag and same_data(mm, entry, other_mm, other_entry):
+                    return path, False, None
+                try:
+                    return path, self.get_checksum(entry) != other.get_checksum(other_entry), None
+                except Exception as e: # corrupted data or entry table, which verify details
+                    return path, True, repr(e)
+
+            modified = []
+            broken = []
+            total_size = sum(self.index[path].decompressed_data_size for path in common)
+            with ThreadPoolExecutor(max_workers = jobs) as executor, Progress("Hash", len(common), total_size) as progress:
+                for path, is_modified, error in executor.map(compare, common):
+                    if error is not None:
+                        broken.append((path, error))
+                    elif is_modified:
+                        modified.append(path)
+                    progress.update(self.index[path].decompressed_data_size)
+        return removed, added, modified, broken
+
+    def write_journal(self, journal_path : str, writes : list[tuple[int, bytes]]):
+        file_size = os.path.getsize(self.filepath)
+        with open(self.filepath, 'rb') as fr, EndianBinaryFileWriter(journal_path) as fw:
+            fw.write(JOURNAL_MAGIC)
+            fw.write_UInt64(file_size)
+            fw.write_UInt32(len(writes))
+            for offset, data in writes:
+                fr.seek(offset)
+                original_data = fr.read(min(len(data), max(file_size - offset, 0)))
+                fw.write_UInt64(offset)
+                fw.write_UInt32(len(original_data))
+                fw.write(original_data)
+            fw.write(JOURNAL_END)
+            fw.file.flush()
+            os.fsync(fw.file.fileno())
+
+    @staticmethod
+    def rollback(filepath : str):
+        journal_path = filepath + '.journal'
+        with EndianBinaryFileReader(journal_path) as fr:
+            assert fr.read(4) == JOURNAL_MAGIC, "Invalid journal magic"
+            file_size = fr.read_UInt64()
+            record_count = fr.read_UInt32()
+            records = []
+            for _ in range(record_count):
+                offset = fr.read_UInt64()
+                records.append((offset, fr.read(fr.read_UInt32())))
+            complete = fr.read(4) == JOURNAL_END
+        if complete: # otherwise the journal was interrupted before the volume was modified
+            with open(filepath, 'r+b') as f:
+                for offset, data in records:
+                    f.seek(offset)
+                    f.write(data)
+                f.truncate(file_size)
+                f.flush()
+                os.fsync(f.fileno())
+        os.remove(journal_path)
+
+def same_data(mm : mmap.mmap, entry : 'VolumeEntry', other_mm : mmap.mmap, other_entry : 'VolumeEntry', chunk_size : int = 0x100000) -> bool:
+    # compares the raw data of two entries chunk by chunk, so that large files aren't copied whole
+    size = entry.path_offset - entry.data_offset
+    if size < 0 or other_entry.path_offset - other_entry.data_offset != size:
+        return False
+    for pos in range(0, size, chunk_size):
+        end = min(pos + chunk_size, size)
+        if mm[entry.data_offset + pos:entry.data_offset + end] != other_mm[other_entry.data_offset + pos:other_entry.data_offset + end]:
+            return False
+    return True
+
+class VolumeEntryTable:
+    # the entry table stored by columns: an array of uint32 per field, offsets kept relative to the data start offset as in the file,
+    # and the paths in a single blob. Indexing or iterating gives VolumeEntry views on it
+    def __init__(self, buffer : mmap.mmap, data_start_offset : int, count : int):
+        self.data_start_offset = data_start_offset
+        table_end = VOLUME_HEADER.size + VOLUME_ENTRY.size * count
+        assert len(buffer) >= table_end, "EOF reached"
+        fields = array(UINT32, buffer[VOLUME_HEADER.size:table_end])
+        if sys.byteorder == 'little':
+            fields.byteswap()
+        field_count = len(VOLUME_ENTRY.names)
+        self.unk_offset, self.data_offset, self.decompressed_data_size, self.compression_flag, self.path_offset, self.unk = \
+            [fields[field::field_count] for field in range(field_count)]
+
+        paths = bytearray()
+        self.path_starts = array(UINT32, [0])
+        for path_offset in self.path_offset:
+            start = path_offset + data_start_offset
+            path_end = buffer.find(b"\x00", start)
+            assert path_end != -1, "EOF reached"
+            paths += buffer[start:path_end]
+            self.path_starts.append(len(paths))
+        self.path_blob = bytes(paths)
+
+    def __len__(self) -> int:
+        return len(self.data_offset)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [VolumeEntry(self, entry_idx) for entry_idx in range(len(self))[idx]]
+        return VolumeEntry(self, range(len(self))[idx])
+
+    def __iter__(self):
+        return map(VolumeEntry, [self] * len(self), range(len(self)))
+
+    def get_path(self, idx : int) -> str:
+        return self.path_blob[self.path_starts[idx]:self.path_starts[idx + 1]].decode('utf-8')
 
 class VolumeEntry:
-    def __init__(self, f : EndianBinaryFileReader, data_start_offset : int):
-        self.unk_offset = f.read_UInt32()
-        self.data_offset = f.read_UInt32() + data_start_offset
-        self.decompressed_data_size = f.read_UInt32()
-        self.compression_flag = f.read_UInt32()
-        self.path_offset = f.read_UInt32() + data_start_offset
-        self.unk = f.read_UInt32()
-        pos = f.tell()
-        f.seek(self.path_offset)
-        self.path = f.read_string_until_null('utf-8')
-        f.seek(pos)
+    # view on an entry of a VolumeEntryTable, with absolute offsets. Setting a field writes it to the table
+    __slots__ = ("table", "idx")
+
+    def __init__(self, table : VolumeEntryTable, idx : int):
+        self.table = table
+        self.idx = idx
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, VolumeEntry) and self.table is other.table and self.idx == other.idx
+
+    def __hash__(self) -> int:
+        return hash((id(self.table), self.idx))
+
+    @property
+    def unk_offset(self) -> int:
+        return self.table.unk_offset[self.idx]
+
+    @property
+    def data_offset(self) -> int:
+        return self.table.data_offset[self.idx] + self.table.data_start_offset
+
+    @data_offset.setter
+    def data_offset(self, value : int):
+        self.table.data_offset[self.idx] = value - self.table.data_start_offset
+
+    @property
+    def decompressed_data_size(self) -> int:
+        return self.table.decompressed_data_size[self.idx]
+
+    @decompressed_data_size.setter
+    def decompressed_data_size(self, value : int):
+        self.table.decompressed_data_size[self.idx] = value
+
+    @property
+    def compression_flag(self) -> int:
+        return self.table.compression_flag[self.idx]
+
+    @property
+    def path_offset(self) -> int:
+        return self.table.path_offset[self.idx] + self.table.data_start_offset
+
+    @path_offset.setter
+    def path_offset(self, value : int):
+        self.table.path_offset[self.idx] = value - self.table.data_start_offset
+
+    @property
+    def unk(self) -> int:
+        return self.table.unk[self.idx]
+
+    @property
+    def path(self) -> str:
+        return self.table.get_path(self.idx)
+
+    def slot_end(self) -> int:
+        # end of the 0x800-aligned slot holding the data and the path, as written by Volume.import_files
+        end = self.path_offset + self.table.path_starts[self.idx + 1] - self.table.path_starts[self.idx]
+        if end % 0x800 == 0:
+            return end + 800
+        return end + 0x800 - end % 0x800
+
+class VolumeEntryReader(io.RawIOBase):
+    def __init__(self, filepath : str, entry : VolumeEntry, chunk_size : int = 0x10000):
+        if entry.compression_flag not in [0, 8]:
+            raise Exception(f"Unsupported compression flag: {entry.compression_flag}")
+        if entry.path_offset < entry.data_offset:
+            raise Exception(f"Path offset {entry.path_offset:#x} is before data offset {entry.data_offset:#x}")
+        self.file = open(filepath, 'rb')
+        self.file.seek(entry.data_offset)
+        self.remaining = entry.path_offset - entry.data_offset
+        self.decompressor = zlib.decompressobj() if entry.compression_flag == 8 else None
+        self.chunk_size = chunk_size
+        self.buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def read_raw(self) -> bytes:
+        data = self.file.read(min(self.chunk_size, self.remaining))
+        self.remaining -= len(data)
+        return data
+
+    def readinto(self, b) -> int:
+        while not self.buffer:
+            if self.decompressor is None:
+                if self.remaining == 0:
+                    return 0
+                self.buffer = self.read_raw()
+                if not self.buffer:
+                    raise Exception("Unexpected end of data")
+            else:
+                if self.decompressor.eof:
+                    return 0
+                data = self.decompressor.unconsumed_tail or self.read_raw()
+                if not data:
+                    raise Exception("Unexpected end of compressed data")
+                self.buffer = self.decompressor.decompress(data, self.chunk_size)
+        size = min(len(b), len(self.buffer))
+        b[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+    def close(self):
+        self.file.close()
+        super().close()
 
 def main():
     args = sys.argv
-    if "-e" in args:
-        vol = Volume(args[2])
-        vol.unpack(args[3])
+    jobs = int(pop_option(args, "--jobs", 1))
+    in_place = pop_flag(args, "--in-place")
+    cache_dir = pop_option(args, "--cache")
+    cache_size = int(pop_option(args, "--cache-size", 1024)) # MiB
+    checksums_path = pop_option(args, "--checksums")
+    patterns = pop_option(args, "--only")
+    stream_threshold = int(pop_option(args, "--stream-threshold", 4)) # MiB
+    compression_level = int(pop_option(args, "--compression-level", -1))
+    compressor_name = pop_option(args, "--compressor", "zlib")
+    verbose = pop_flag(args, "--verbose")
+    trace_path = pop_option(args, "--trace")
+    profiling = pop_flag(args, "--profile")
+    TRACE.record_events = trace_path is not None
+    status = 0
+    with profile(profiling):
+        if "-e" in args:
+            vol = Volume(args[2])
+            vol.unpack(args[3], jobs, patterns.split(',') if patterns is not None else None, stream_threshold << 20, verbose)
+            if checksums_path is not None:
+                vol.save_checksums(checksums_path)
+
+        if "-i" in args:
+            vol = Volume(args[2])
+            if checksums_path is not None:
+                vol.load_checksums(checksums_path)
+            cache = BuildCache(cache_dir, cache_size << 20) if cache_dir is not None else None
+            compressor = Compressor(compressor_name, compression_level)
+            if in_place:
+                vol.patch_files(args[3], jobs, cache, compressor, verbose)
+            else:
+                vol.import_files(args[3], args[4], jobs, cache, compressor, verbose)
+            if cache is not None:
+                cache.save()
+
+        if "-r" in args:
+            Volume.rollback(args[2])
+
+        if "-v" in args:
+            vol = Volume(args[2])
+            problems = vol.verify(jobs)
+            for problem in problems:
+                print(problem)
+            print(f"{args[2]}: {len(vol.entries)} files, {len(problems)} problems found")
+            status = 1 if problems else 0
+
+        if "-d" in args:
+            vol = Volume(args[2])
+            if checksums_path is not None:
+                vol.load_checksums(checksums_path)
+            removed, added, modified, broken = vol.diff(Volume(args[3]), jobs)
+            for path in removed:
+                print(f"- {path}")
+            for path in added:
+                print(f"+ {path}")
+            for path in modified:
+                print(f"M {path}")
+            for path, error in broken:
+                print(f"! {path}: {error}")
+            print(f"{len(modified)} modified, {len(added)} added, {len(removed)} removed, {len(broken)} unreadable files")
+            status = 1 if removed or added or modified or broken else 0
 
-    if "-i" in args:
-        vol = Volume(args[2])
-        vol.import_files(args[3], args[4])
+    if trace_path is not None:
+        TRACE.save(trace_path)
+    if trace_path is not None or profiling:
+        print(TRACE.summary())
+    if status:
+        sys.exit(status)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from Volume import Volume
+from utils import Compressor, COMPRESSORS, pop_option
+from utils.Compression import load_backend
+from synthetic import make_volume
+
+def main():
+    args = sys.argv[1:]
+    entry_count = int(pop_option(args, "--entries", 1000))
+    entropy_bits = int(pop_option(args, "--entropy", 3))
+    levels = [int(level) for level in pop_option(args, "--levels", "-1,0,1,6,9").split(',')]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        volume_path = os.path.join(tmp_dir, "volume.dat")
+        make_volume(volume_path, entry_count, entropy_bits = entropy_bits, compressed_ratio = 1.0)
+        vol = Volume(volume_path)
+        files = [vol.read_entry(entry) for entry in vol.entries]
+    total_size = sum(len(data) for data in files)
+    print(f"{len(files)} files, {total_size / 2**20:.1f} MiB, entropy {entropy_bits} bits per byte")
+    print(f"{'compressor':10} {'level':>5} {'ratio':>7} {'MiB/s':>9}")
+    for name in COMPRESSORS:
+        if load_backend(name) is None:
+            print(f"{name:10} not installed")
+            continue
+        for level in levels:
+            compressor = Compressor(name, level)
+            start = time.perf_counter()
+            compressed_size = sum(len(compressor(data)) for data in files)
+            elapsed = time.perf_counter() - start
+            print(f"{name:10} {level:5} {compressed_size / total_size:7.1%} {total_size / 2**20 / elapsed:9.1f}")
+
+if __name__ == '__main__':
+    main()
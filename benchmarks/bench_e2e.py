@@ -0,0 +1,164 @@
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from Volume import Volume
+from AkibaMSG import batch_export, batch_import
+from utils import pop_option, pop_flag
+from synthetic import make_volume, make_lang, make_mods
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+def reset_peak_rss() -> bool:
+    # Linux only: resets the peak resident set size of the process, so that each phase reports its own peak
+    try:
+        with open("/proc/self/clear_refs", 'w') as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def peak_rss() -> float:
+    # peak resident set size in MiB, None when it can't be measured on this platform
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+def measure(name : str, func, size : int, file_count : int, results : dict):
+    # the progress lines of the tools are silenced, the results are printed at the end
+    reset_peak_rss()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+    result = {"seconds" : elapsed, "mib_per_s" : size / 2**20 / elapsed, "files_per_s" : file_count / elapsed, "peak_rss_mib" : peak_rss()}
+    if name in results:
+        # best time of the runs, worst memory
+        result["seconds"] = min(result["seconds"], results[name]["seconds"])
+        result["mib_per_s"] = max(result["mib_per_s"], results[name]["mib_per_s"])
+        result["files_per_s"] = max(result["files_per_s"], results[name]["files_per_s"])
+        if results[name]["peak_rss_mib"] is not None:
+            result["peak_rss_mib"] = max(result["peak_rss_mib"], results[name]["peak_rss_mib"])
+    results[name] = result
+
+def dir_size(root_dir : str) -> tuple[int, int]:
+    size = 0
+    file_count = 0
+    for path in Path(root_dir).rglob("*"):
+        if path.is_file():
+            size += path.stat().st_size
+            file_count += 1
+    return size, file_count
+
+def run_suite(data_dir : str, work_dir : str, params : dict, results : dict):
+    jobs = params["jobs"]
+    table_format = params["format"]
+    volume_path = os.path.join(data_dir, "volume.dat")
+    mod_dir = os.path.join(data_dir, "mod")
+    lang_dir = os.path.join(data_dir, "lang")
+    volume_size = os.path.getsize(volume_path)
+    entry_count = params["entries"]
+
+    volume = None
+    def open_volume():
+        nonlocal volume
+        volume = Volume(volume_path)
+    measure("volume_open", open_volume, volume_size, entry_count, results)
+    decompressed_size = sum(entry.decompressed_data_size for entry in volume.entries)
+
+    measure("volume_unpack", lambda: volume.unpack(os.path.join(work_dir, "unpacked"), jobs), decompressed_size, entry_count, results)
+
+    mod_size, mod_count = dir_size(mod_dir)
+    measure("volume_import", lambda: volume.import_files(mod_dir, os.path.join(work_dir, "volume.dat"), jobs),
+            volume_size + mod_size, entry_count, results)
+
+    lang_size, lang_count = dir_size(lang_dir)
+    table_dir = os.path.join(work_dir, "tables")
+    measure("text_export", lambda: batch_export(lang_dir, table_dir, jobs, table_format), lang_size, lang_count, results)
+    measure("text_import", lambda: batch_import(lang_dir, table_dir, os.path.join(work_dir, "lang"), jobs, table_format, True),
+            lang_size, lang_count, results)
+
+def compare(results : dict, baseline : dict, tolerance : float) -> list[str]:
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline["results"]:
+            continue
+        base = baseline["results"][name]
+        if result["seconds"] > base["seconds"] * (1 + tolerance):
+            regressions.append(f"{name}: {result['seconds']:.3f} s, baseline {base['seconds']:.3f} s")
+        if result["peak_rss_mib"] is not None and base["peak_rss_mib"] is not None and result["peak_rss_mib"] > base["peak_rss_mib"] * (1 + tolerance):
+            regressions.append(f"{name}: peak RSS {result['peak_rss_mib']:.1f} MiB, baseline {base['peak_rss_mib']:.1f} MiB")
+    return regressions
+
+def main():
+    args = sys.argv[1:]
+    params = {
+        "entries" : int(pop_option(args, "--entries", 2000)),
+        "scripts" : int(pop_option(args, "--scripts", 200)),
+        "modified_ratio" : float(pop_option(args, "--modified", 0.1)),
+        "compressed_ratio" : float(pop_option(args, "--compressed", 0.75)),
+        "jobs" : int(pop_option(args, "--jobs", 1)),
+        "format" : pop_option(args, "--format", "tsv"),
+    }
+    repeat = int(pop_option(args, "--repeat", 3))
+    tolerance = float(pop_option(args, "--tolerance", 0.2))
+    baseline_path = Path(pop_option(args, "--baseline", DEFAULT_BASELINE))
+    save_baseline = pop_flag(args, "--save-baseline")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = os.path.join(tmp_dir, "data")
+        volume_path = os.path.join(data_dir, "volume.dat")
+        os.makedirs(data_dir)
+        make_volume(volume_path, params["entries"], compressed_ratio = params["compressed_ratio"])
+        volume = Volume(volume_path)
+        modified = [entry.path for entry in volume.entries[::max(1, round(1 / params["modified_ratio"]))]] if params["modified_ratio"] > 0 else []
+        make_mods(modified, os.path.join(data_dir, "mod"))
+        del volume
+        line_count = make_lang(os.path.join(data_dir, "lang"), params["scripts"])
+        print(f"{params['entries']} entries ({os.path.getsize(volume_path) / 2**20:.1f} MiB, {len(modified)} modified), "
+              f"{params['scripts']} scripts ({line_count} lines), jobs={params['jobs']}, format={params['format']}")
+
+        for run in range(repeat):
+            work_dir = os.path.join(tmp_dir, f"run_{run}")
+            run_suite(data_dir, work_dir, params, results)
+
+    for name, result in results.items():
+        rss = "n/a" if result["peak_rss_mib"] is None else f"{result['peak_rss_mib']:.1f} MiB"
+        print(f"{name:14} {result['seconds']:8.3f} s {result['mib_per_s']:9.1f} MiB/s {result['files_per_s']:10.1f} files/s   peak RSS {rss}")
+
+    if save_baseline:
+        with open(baseline_path, 'w') as f:
+            json.dump({"params" : params, "results" : results}, f, indent = 2)
+        print(f"Saved baseline to {baseline_path}")
+    elif baseline_path.exists():
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        if baseline["params"] != params:
+            print(f"Warning: the baseline was measured with other parameters: {baseline['params']}")
+        regressions = compare(results, baseline, tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regression against {baseline_path} (tolerance {tolerance:.0%})")
+
+if __name__ == '__main__':
+    main()
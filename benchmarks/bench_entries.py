@@ -0,0 +1,80 @@
+import mmap
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from Volume import Volume, VOLUME_HEADER, VOLUME_ENTRY
+from synthetic import make_volume
+
+class ObjectEntry:
+    # one object per entry, as the entries were stored before VolumeEntryTable
+    def __init__(self, record : tuple, buffer : mmap.mmap, data_start_offset : int):
+        self.unk_offset = record.unk_offset
+        self.data_offset = record.data_offset + data_start_offset
+        self.decompressed_data_size = record.decompressed_data_size
+        self.compression_flag = record.compression_flag
+        self.path_offset = record.path_offset + data_start_offset
+        self.unk = record.unk
+        self.path = buffer[self.path_offset:buffer.find(b"\x00", self.path_offset)].decode('utf-8')
+
+    def slot_end(self) -> int:
+        end = self.path_offset + len(self.path.encode('utf-8'))
+        if end % 0x800 == 0:
+            return end + 800
+        return end + 0x800 - end % 0x800
+
+def load_objects(filepath : str) -> list[ObjectEntry]:
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as mm:
+        header = VOLUME_HEADER.unpack_from(mm)
+        records = list(VOLUME_ENTRY.iter_unpack(mm, VOLUME_HEADER.size, header.entry_count1))
+        return [ObjectEntry(record, mm, header.data_start_offset) for record in records]
+
+def measure_memory(func) -> tuple[object, float]:
+    # result, and memory kept by the result in MiB
+    tracemalloc.start()
+    result = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size / 2**20
+
+def measure(func, repeat : int = 5) -> float:
+    # best time of several runs in ms
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    entry_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        volume_path = os.path.join(tmp_dir, "volume.dat")
+        make_volume(volume_path, entry_count, sizes = [0x40], compressed_ratio = 0)
+        objects, objects_size = measure_memory(lambda: load_objects(volume_path))
+        vol, table_size = measure_memory(lambda: Volume(volume_path))
+        objects_time = measure(lambda: load_objects(volume_path))
+        table_time = measure(lambda: Volume(volume_path))
+    table = vol.entries
+    print(f"{entry_count} entries")
+    print(f"memory   objects {objects_size:8.2f} MiB | table {table_size:8.2f} MiB")
+    print(f"load     objects {objects_time:8.1f} ms | table {table_time:8.1f} ms")
+    loops = [
+        ("sizes", lambda entries: sum(entry.decompressed_data_size for entry in entries)),
+        ("paths", lambda entries: [entry.path for entry in entries]),
+        ("sort", lambda entries: sorted(entries, key = lambda entry: entry.data_offset)),
+        ("slots", lambda entries: [entry.slot_end() for entry in entries]),
+    ]
+    for name, loop in loops:
+        print(f"{name:8} objects {measure(lambda: loop(objects)):8.1f} ms | views {measure(lambda: loop(table)):8.1f} ms")
+    print(f"sizes    columns {measure(lambda: sum(table.decompressed_data_size)):8.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+def import_time(module : str) -> tuple[float, list[tuple[float, str]]]:
+    # runs a fresh interpreter with -X importtime and returns the cumulative import time of the module in ms,
+    # plus the slowest modules it imports
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd = ROOT_DIR,
+                            capture_output = True, text = True, check = True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports.append((int(cumulative) / 1000, name.strip()))
+    total = next(cumulative for cumulative, name in reversed(imports) if name == module)
+    return total, sorted((item for item in imports if item[1] != module), reverse = True)
+
+def startup_time(args : list[str], repeat : int = 5) -> float:
+    # wall time in ms of the best of several runs, interpreter startup included
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", "import time, sys, runpy; start = time.perf_counter(); sys.argv = sys.argv[1:]; "
+                                 "runpy.run_path(sys.argv[0], run_name = '__main__'); print(time.perf_counter() - start)"] + args,
+                                cwd = ROOT_DIR, capture_output = True, text = True, check = True)
+        elapsed = float(result.stdout.splitlines()[-1]) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    for module in ["utils", "Volume", "AkibaMSG"]:
+        total, imports = import_time(module)
+        print(f"import {module}: {total:.1f} ms")
+        for cumulative, name in imports[:5]:
+            print(f"  {cumulative:8.1f} ms  {name}")
+    for script in ["Volume.py", "AkibaMSG.py"]:
+        print(f"{script} startup without arguments: {startup_time([script]):.1f} ms")
+
+if __name__ == '__main__':
+    main()
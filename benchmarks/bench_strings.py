@@ -0,0 +1,82 @@
+import os
+import random
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils import EndianBinaryFileReader, EndianBinaryStreamReader
+
+# previous implementations, reading one character per call
+def old_file_read_string_until_null(f : EndianBinaryFileReader, encoding : str) -> str:
+    data = b""
+    byte = f.read(1)
+    while byte not in [b"\x00", b""]:
+        data += byte
+        byte = f.read(1)
+    assert byte != b"", "EOF reached"
+    return data.decode(encoding)
+
+def old_file_read_utf16_until_null(f : EndianBinaryFileReader) -> str:
+    data = b""
+    charbytes = f.read(2)
+    while charbytes not in [b"\x00\x00", b""]:
+        data += charbytes
+        charbytes = f.read(2)
+    assert charbytes != b"", "EOF reached"
+    return data.decode("utf-16")
+
+def old_stream_read_utf16_until_null(f : EndianBinaryStreamReader) -> str:
+    output = ""
+    char = f.read(2).decode('utf-16')
+    while char not in ["\x00", ""]:
+        output += char
+        char = f.read(2).decode('utf-16')
+    assert char != ""
+    return output
+
+def make_strings(length : int, count : int) -> list[str]:
+    rng = random.Random(length)
+    alphabet = "abcdefghijklmnopqrstuvwxyz ABCDEFGHIJKLMNOPQRSTUVWXYZ.,!?あいうえおアキバ"
+    return ["".join(rng.choice(alphabet) for _ in range(length)) for _ in range(count)]
+
+def read_all(filepath : str, count : int, func, **kwargs):
+    with EndianBinaryFileReader(filepath) as f:
+        for _ in range(count):
+            func(f, **kwargs)
+
+def main():
+    count = 2000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for length in [8, 32, 128, 512]:
+            strings = make_strings(length, count)
+            ascii_path = os.path.join(tmp_dir, f"ascii_{length}.bin")
+            utf16_path = os.path.join(tmp_dir, f"utf16_{length}.bin")
+            with open(ascii_path, 'wb') as f:
+                f.write(b"".join(string.encode('utf-8') + b"\x00" for string in strings))
+            utf16_data = b"".join((string + "\x00").encode('utf-16-le') for string in strings)
+            with open(utf16_path, 'wb') as f:
+                f.write(utf16_data)
+
+            def stream_read_all(func):
+                f = EndianBinaryStreamReader(utf16_data)
+                for _ in range(count):
+                    func(f)
+
+            timings = [
+                ("file utf-8", lambda: read_all(ascii_path, count, old_file_read_string_until_null, encoding = 'utf-8'),
+                               lambda: read_all(ascii_path, count, EndianBinaryFileReader.read_string_until_null, encoding = 'utf-8')),
+                ("file utf-16", lambda: read_all(utf16_path, count, old_file_read_utf16_until_null),
+                                lambda: read_all(utf16_path, count, EndianBinaryFileReader.read_utf16_until_null)),
+                ("stream utf-16", lambda: stream_read_all(old_stream_read_utf16_until_null),
+                                  lambda: stream_read_all(EndianBinaryStreamReader.read_utf16_until_null)),
+            ]
+            for name, old, new in timings:
+                old_time = min(timeit.repeat(old, number = 1, repeat = 3))
+                new_time = min(timeit.repeat(new, number = 1, repeat = 3))
+                print(f"{name:<14} {length:>4} chars: old {old_time * 1e6 / count:8.2f} us/string, new {new_time * 1e6 / count:8.2f} us/string, x{old_time / new_time:.1f}")
+
+if __name__ == '__main__':
+    main()
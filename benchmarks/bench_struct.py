@@ -0,0 +1,46 @@
+import random
+import struct
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils import EndianBinaryStreamReader, RecordSchema
+
+VOLUME_ENTRY = RecordSchema("VolumeEntryRecord", [("unk_offset", "I"), ("data_offset", "I"), ("decompressed_data_size", "I"),
+                                                  ("compression_flag", "I"), ("path_offset", "I"), ("unk", "I")], 'big')
+
+# the per-field path used before: a new format string and a struct.unpack call for every value
+def read_UInt32_per_call(f : EndianBinaryStreamReader) -> int:
+    return struct.unpack(f'{f.endian_flag}I', f.read(4))[0]
+
+def per_field(data : bytes, count : int) -> list:
+    f = EndianBinaryStreamReader(data, 'big')
+    return [tuple(read_UInt32_per_call(f) for _ in range(6)) for _ in range(count)]
+
+def precompiled_per_field(data : bytes, count : int) -> list:
+    f = EndianBinaryStreamReader(data, 'big')
+    return [tuple(f.read_UInt32() for _ in range(6)) for _ in range(count)]
+
+def schema_per_record(data : bytes, count : int) -> list:
+    f = EndianBinaryStreamReader(data, 'big')
+    return [f.read_record(VOLUME_ENTRY) for _ in range(count)]
+
+def schema_bulk(data : bytes, count : int) -> list:
+    return list(VOLUME_ENTRY.iter_unpack(data, 0, count))
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rng = random.Random(0)
+    data = rng.randbytes(VOLUME_ENTRY.size * count)
+    expected = per_field(data, count)
+    print(f"decoding {count} records of {VOLUME_ENTRY.size} bytes")
+    for name, func in [("per field, format per call", per_field), ("per field, precompiled", precompiled_per_field),
+                       ("schema, record per call", schema_per_record), ("schema, iter_unpack", schema_bulk)]:
+        assert [tuple(record) for record in func(data, count)] == expected
+        elapsed = min(timeit.repeat(lambda: func(data, count), number = 1, repeat = 3))
+        print(f"{name:<28} {elapsed * 1e3:8.2f} ms, {elapsed * 1e9 / count:8.1f} ns/record")
+
+if __name__ == '__main__':
+    main()
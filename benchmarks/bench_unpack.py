@@ -0,0 +1,34 @@
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from Volume import Volume
+from synthetic import make_volume
+
+def main():
+    entry_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    job_counts = [1, 2, 4, 8]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        volume_path = os.path.join(tmp_dir, "volume.dat")
+        make_volume(volume_path, entry_count)
+        vol = Volume(volume_path)
+        total_size = sum(entry.decompressed_data_size for entry in vol.entries)
+        print(f"{entry_count} entries, {total_size / 2**20:.1f} MiB decompressed")
+        for jobs in job_counts:
+            out_dir = os.path.join(tmp_dir, f"out_{jobs}")
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                vol.unpack(out_dir, jobs)
+                elapsed = time.perf_counter() - start
+            print(f"jobs={jobs}: {elapsed:.3f} s, {total_size / 2**20 / elapsed:.1f} MiB/s")
+            shutil.rmtree(out_dir)
+
+if __name__ == '__main__':
+    main()
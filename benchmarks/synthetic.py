@@ -0,0 +1,140 @@
+import os
+import random
+import struct
+import zlib
+
+VOLUME_MAGIC = b"\xFA\xDE\xBA\xBE"
+FILE_SIZES = [0x40, 0x400, 0x4000, 0x40000]
+
+def make_payload(rng : random.Random, size : int, entropy_bits : int) -> bytes:
+    # entropy_bits controls the compression ratio: 8 is incompressible, 1 compresses very well
+    if entropy_bits >= 8:
+        return rng.randbytes(size)
+    return rng.randbytes(size).translate(bytes(byte >> (8 - entropy_bits) for byte in range(256)))
+
+def make_volume(filepath : str, entry_count : int = 1000, sizes : list = FILE_SIZES, entropy_bits : int = 3,
+                compressed_ratio : float = 0.75, seed : int = 0):
+    rng = random.Random(seed)
+    data_start_offset = 0x14 + 0x18 * entry_count
+    data_start_offset += 0x800 - data_start_offset % 0x800
+    table = bytearray()
+    with open(filepath, 'wb') as f:
+        f.write(bytes(data_start_offset))
+        for idx in range(entry_count):
+            path = f"dir_{idx % 16}/sub_{idx % 5}/file_{idx:06}.bin".encode('utf-8')
+            data = make_payload(rng, rng.choice(sizes), entropy_bits)
+            decompressed_size = len(data)
+            compression_flag = 8 if rng.random() < compressed_ratio else 0
+            if compression_flag == 8:
+                data = zlib.compress(data)
+            data_offset = f.tell() - data_start_offset
+            f.write(data)
+            path_offset = f.tell() - data_start_offset
+            f.write(path)
+            if f.tell() % 0x800 == 0:
+                f.write(b'\x00' * 800)
+            else:
+                f.write(bytes(0x800 - f.tell() % 0x800))
+            table += struct.pack('>IIIIII', idx, data_offset, decompressed_size, compression_flag, path_offset, 0)
+        datasize = f.tell() - data_start_offset
+        f.seek(0)
+        f.write(VOLUME_MAGIC + struct.pack('>IIII', entry_count, entry_count, data_start_offset, datasize))
+        f.write(table)
+    return os.path.getsize(filepath)
+
+WORDS = ["hello", "Akiba", "strip", "ねえ", "…", "choice", "run", "fight", "Nanashi", "vampire", "Shizuku", "Rin"]
+
+def make_line(rng : random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 12)))
+
+def make_lines(rng : random.Random, count : int, repeated_ratio : float = 0.2) -> list[str]:
+    # a part of the lines comes back several times, like the common lines of the game
+    common = [make_line(rng) for _ in range(16)]
+    return [rng.choice(common) if rng.random() < repeated_ratio else make_line(rng) for _ in range(count)]
+
+def encode_utf16(string : str, terminator : str = '\x00') -> bytes:
+    return (string + terminator).encode('utf-16-le')
+
+def make_gametext(filepath : str, lines : list[str]):
+    # Int32 count, Int32 start offset, Int32 offsets relative to offset 8, then the null-terminated strings
+    strings = [encode_utf16(line) for line in lines]
+    offsets = []
+    offset = 4 * len(strings)
+    for string in strings:
+        offsets.append(offset)
+        offset += len(string)
+    with open(filepath, 'wb') as f:
+        f.write(struct.pack(f'<ii{len(offsets)}i', len(strings), 8, *offsets))
+        f.write(b''.join(strings))
+
+def make_task_change_text(filepath : str, lines : list[str]):
+    # Int32 count, 12 bytes of padding, then (offset, size, padding) records and the double-null-terminated strings
+    strings = [encode_utf16(line, '\x00\x00') for line in lines]
+    table = bytearray()
+    offset = 0x10 + 12 * len(strings)
+    for string in strings:
+        table += struct.pack('<iii', offset, len(string), 0)
+        offset += len(string)
+    with open(filepath, 'wb') as f:
+        f.write(struct.pack('<i', len(strings)) + bytes(12))
+        f.write(table)
+        f.write(b''.join(strings))
+
+def make_talkevent(filepath : str, rng : random.Random, lines : list[str]) -> int:
+    # 12 bytes of padding, Int32 count, 0x50 byte entries, then the strings. Type 1 entries are dialogue lines,
+    # type 2 entries a caption and three choices, the others carry no text. Returns the number of strings
+    table = bytearray()
+    strings = bytearray()
+    lines = iter(lines)
+    entry_count = 0
+    string_count = 0
+    for line in lines:
+        entry_type = rng.choice([0, 1, 1, 1, 2])
+        entry = bytearray(rng.randbytes(0x50))
+        struct.pack_into('<hhh', entry, 0, rng.randint(0, 100), entry_type, rng.randint(0, 9))
+        if entry_type == 1:
+            struct.pack_into('<H', entry, 0x20, len(strings))
+            strings += encode_utf16(line)
+            string_count += 1
+        elif entry_type == 2:
+            offsets = []
+            for string in [line, next(lines, "Yes"), next(lines, "No"), next(lines, "...")]:
+                offsets.append(len(strings))
+                strings += encode_utf16(string)
+            struct.pack_into('<H', entry, 0x20, offsets[0])
+            struct.pack_into('<HHH', entry, 0x28, *offsets[1:])
+            string_count += 4
+        table += entry
+        entry_count += 1
+    with open(filepath, 'wb') as f:
+        f.write(bytes(12) + struct.pack('<i', entry_count))
+        f.write(table)
+        f.write(strings)
+    return string_count
+
+def make_lang(root_dir : str, script_count : int = 200, gametext_lines : int = 5000, task_change_lines : int = 200,
+              script_lines : tuple = (5, 60), repeated_ratio : float = 0.2, seed : int = 0) -> int:
+    # lang folder laid out as the game's, as read by AkibaMSG. Returns the number of lines
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(root_dir, "gametext"), exist_ok = True)
+    os.makedirs(os.path.join(root_dir, "script", "talkevent"), exist_ok = True)
+    make_gametext(os.path.join(root_dir, "gametext", "gametext.bin"), make_lines(rng, gametext_lines, repeated_ratio))
+    make_task_change_text(os.path.join(root_dir, "gametext", "TaskChangeText.bin"), make_lines(rng, task_change_lines, repeated_ratio))
+    line_count = gametext_lines + task_change_lines
+    for idx in range(script_count):
+        lines = make_lines(rng, rng.randint(*script_lines), repeated_ratio)
+        line_count += make_talkevent(os.path.join(root_dir, "script", "talkevent", f"ev_{idx:04}.bin"), rng, lines)
+    return line_count
+
+def make_mods(filepaths : list[str], root_dir : str, seed : int = 0) -> int:
+    # modified versions of the given extracted files, written to root_dir. Returns the total size
+    rng = random.Random(seed)
+    total_size = 0
+    for filepath in filepaths:
+        out_path = os.path.join(root_dir, filepath)
+        os.makedirs(os.path.dirname(out_path), exist_ok = True)
+        data = make_payload(rng, rng.choice(FILE_SIZES), 3)
+        with open(out_path, 'wb') as f:
+            f.write(data)
+        total_size += len(data)
+    return total_size
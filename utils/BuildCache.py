@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+class BuildCache:
+    # persistent cache of transformed (e.g. compressed) files, keyed by the content hash of the source file.
+    # Files whose path, size and mtime didn't change since the last run aren't even read again
+    def __init__(self, cache_dir : str, max_size : int = 1 << 30):
+        self.cache_dir = Path(cache_dir)
+        self.blob_dir = self.cache_dir / "blobs"
+        self.index_path = self.cache_dir / "index.json"
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        os.makedirs(self.blob_dir, exist_ok = True)
+        if self.index_path.is_file():
+            with open(self.index_path, 'r', encoding = 'utf-8') as f:
+                index = json.load(f)
+            self.files : dict = index["files"]
+            self.blobs : dict = index["blobs"]
+        else:
+            self.files = {}
+            self.blobs = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.save()
+
+    def load(self, filepath : str, variant : str, transform) -> tuple[bytes, int]:
+        # returns transform(file content) and the size of the file
+        stat = os.stat(filepath)
+        key = str(Path(filepath).resolve())
+        data = None
+        with self.lock:
+            record = self.files.get(key)
+        if record is not None and record["size"] == stat.st_size and record["mtime"] == stat.st_mtime_ns:
+            digest = record["hash"]
+        else:
+            with open(filepath, 'rb') as f:
+                data = f.read()
+            digest = hashlib.sha1(data).hexdigest()
+            with self.lock:
+                self.files[key] = {"size" : stat.st_size, "mtime" : stat.st_mtime_ns, "hash" : digest}
+
+        blob_name = f"{digest}_{variant}"
+        blob = self.get_blob(blob_name)
+        if blob is None:
+            if data is None:
+                with open(filepath, 'rb') as f:
+                    data = f.read()
+            blob = transform(data)
+            self.put_blob(blob_name, blob)
+        return blob, stat.st_size
+
+    def get_blob(self, blob_name : str):
+        with self.lock:
+            if blob_name not in self.blobs:
+                return None
+            self.blobs[blob_name]["last_used"] = time.time()
+        try:
+            with open(self.blob_dir / blob_name, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            with self.lock:
+                self.blobs.pop(blob_name, None)
+            return None
+
+    def put_blob(self, blob_name : str, blob : bytes):
+        tmp_path = self.blob_dir / f"{blob_name}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(blob)
+        os.replace(tmp_path, self.blob_dir / blob_name)
+        with self.lock:
+            self.blobs[blob_name] = {"size" : len(blob), "last_used" : time.time()}
+
+    def evict(self):
+        # drops the least recently used blobs until the cache fits in max_size
+        total_size = sum(blob["size"] for blob in self.blobs.values())
+        for blob_name in sorted(self.blobs, key = lambda name: self.blobs[name]["last_used"]):
+            if total_size <= self.max_size:
+                break
+            total_size -= self.blobs.pop(blob_name)["size"]
+            try:
+                os.remove(self.blob_dir / blob_name)
+            except FileNotFoundError:
+                pass
+
+    def save(self):
+        with self.lock:
+            self.evict()
+            tmp_path = self.index_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding = 'utf-8') as f:
+                json.dump({"files" : self.files, "blobs" : self.blobs}, f)
+            os.replace(tmp_path, self.index_path)
@@ -0,0 +1,48 @@
+import zlib
+
+COMPRESSORS = ["zlib", "zlib-ng", "isal"]
+
+def isal_level(level : int) -> int:
+    # ISA-L only has levels 0 to 3, 2 being its default
+    return 2 if level == -1 else min(3, (level + 2) // 3)
+
+def load_backend(name : str):
+    # compress(data, level) function of a backend producing zlib streams, None when its module isn't installed
+    if name == "zlib":
+        return zlib.compress
+    if name == "zlib-ng":
+        try:
+            from zlib_ng import zlib_ng
+        except ImportError:
+            return None
+        return zlib_ng.compress
+    if name == "isal":
+        try:
+            from isal import isal_zlib
+        except ImportError:
+            return None
+        return lambda data, level: isal_zlib.compress(data, isal_level(level))
+    raise Exception(f"Unknown compressor: {name}, expected one of {', '.join(COMPRESSORS + ['auto'])}")
+
+class Compressor:
+    # name is one of COMPRESSORS, or "auto" for the fastest one installed. A backend which isn't installed falls back to zlib
+    def __init__(self, name : str = "zlib", level : int = -1):
+        assert -1 <= level <= 9, f"Invalid compression level: {level}"
+        candidates = [name] if name != "auto" else ["isal", "zlib-ng", "zlib"]
+        for candidate in candidates:
+            backend = load_backend(candidate)
+            if backend is not None:
+                break
+        if backend is None:
+            print(f"{name} is not installed, falling back to zlib")
+            candidate, backend = "zlib", zlib.compress
+        self.name = candidate
+        self.level = level
+        self.backend = backend
+        # names the cached compressed files, which only match for the same backend and level
+        self.variant = "zlib" if (candidate, level) == ("zlib", -1) else f"{candidate}-{level}"
+
+    def __call__(self, data : bytes) -> bytes:
+        return self.backend(data, self.level)
+
+DEFAULT_COMPRESSOR = Compressor()
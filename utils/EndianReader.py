@@ -1,5 +1,13 @@
 import struct
 from io import BytesIO
+from .RecordSchema import RecordSchema
+
+def find_utf16_null(data : bytes, start : int = 0) -> int:
+    # only matches a null character aligned on a 2-byte boundary from start
+    idx = data.find(b"\x00\x00", start)
+    while idx != -1 and (idx - start) % 2 != 0:
+        idx = data.find(b"\x00\x00", idx + 1)
+    return idx
 
 class EndianBinaryFileReader:
     def __init__(self,filepath : str, endianness : str = 'little'):
@@ -23,52 +31,72 @@ class EndianBinaryFileReader:
             self.endian_flag = '>'
         else:
             raise Exception(r"Unknown endianness : should be 'little' or 'big'")
+        self.structs = {fmt : struct.Struct(self.endian_flag + fmt) for fmt in "bBhHiIqQ"}
 
     def read_Int8(self) -> int:
-        return struct.unpack(f'{self.endian_flag}b',self.read(1))[0]
+        return self.structs['b'].unpack(self.read(1))[0]
 
     def read_UInt8(self) -> int:
-        return struct.unpack(f'{self.endian_flag}B',self.read(1))[0]
+        return self.structs['B'].unpack(self.read(1))[0]
 
     def read_Int16(self) -> int:
-        return struct.unpack(f'{self.endian_flag}h',self.read(2))[0]
+        return self.structs['h'].unpack(self.read(2))[0]
     
     def read_UInt16(self) -> int:
-        return struct.unpack(f'{self.endian_flag}H',self.read(2))[0]
+        return self.structs['H'].unpack(self.read(2))[0]
 
     def read_Int32(self) -> int:
-        return struct.unpack(f'{self.endian_flag}i',self.read(4))[0]
+        return self.structs['i'].unpack(self.read(4))[0]
     
     def read_UInt32(self) -> int:
-        return struct.unpack(f'{self.endian_flag}I',self.read(4))[0]
+        return self.structs['I'].unpack(self.read(4))[0]
 
     def read_Int64(self) -> int:
-        return struct.unpack(f'{self.endian_flag}q',self.read(8))[0]
+        return self.structs['q'].unpack(self.read(8))[0]
     
     def read_UInt64(self) -> int:
-        return struct.unpack(f'{self.endian_flag}Q',self.read(8))[0]
+        return self.structs['Q'].unpack(self.read(8))[0]
 
     def read_string(self, encoding : str, size : int) -> str:
         return self.read(size).decode(encoding)
     
-    def read_string_until_null(self, encoding : str) -> str:
-        data = b""
-        byte = self.read(1)
-        while byte not in [b"\x00", b""]:
-            data += byte
-            byte = self.read(1)
-        assert byte != b"", "EOF reached"
+    def read_string_until_null(self, encoding : str, chunk_size : int = 0x100) -> str:
+        start = self.tell()
+        chunks = []
+        while True:
+            chunk = self.read(chunk_size)
+            assert chunk != b"", "EOF reached"
+            end = chunk.find(b"\x00")
+            if end != -1:
+                chunks.append(chunk[:end])
+                break
+            chunks.append(chunk)
+        data = b"".join(chunks)
+        self.seek(start + len(data) + 1)
         return data.decode(encoding)
-    
-    def read_utf16_until_null(self) -> str:
-        data = b""
-        charbytes = self.read(2)
-        while charbytes not in [b"\x00\x00", b""]:
-            data += charbytes
-            charbytes = self.read(2)
-        assert charbytes != b"", "EOF reached"
+
+    def read_utf16_until_null(self, chunk_size : int = 0x100) -> str:
+        # chunk_size must be even so that characters never straddle two chunks
+        start = self.tell()
+        chunks = []
+        while True:
+            chunk = self.read(chunk_size)
+            assert len(chunk) >= 2, "EOF reached"
+            end = find_utf16_null(chunk)
+            if end != -1:
+                chunks.append(chunk[:end])
+                break
+            chunks.append(chunk)
+        data = b"".join(chunks)
+        self.seek(start + len(data) + 2)
         return data.decode("utf-16")
 
+    def read_record(self, schema : RecordSchema):
+        return schema.unpack(self.read(schema.size))
+
+    def read_records(self, schema : RecordSchema, count : int) -> list:
+        return list(schema.iter_unpack(self.read(schema.size * count), 0, count))
+
     def align(self, alignment : int):
         mod = self.tell() % alignment
         if mod != 0:
@@ -77,6 +105,7 @@ class EndianBinaryFileReader:
 class EndianBinaryStreamReader:
     def __init__(self,stream : bytes, endianness : str = 'little'):
         self.set_endianness(endianness)
+        self.data = stream
         self.stream = BytesIO(stream)
         self.read = self.stream.read
         self.tell = self.stream.tell
@@ -90,42 +119,47 @@ class EndianBinaryStreamReader:
             self.endian_flag = '>'
         else:
             raise Exception(r"Unknown endianness : should be 'little' or 'big'")
+        self.structs = {fmt : struct.Struct(self.endian_flag + fmt) for fmt in "bBhHiIqQ"}
 
     def read_Int8(self) -> int:
-        return struct.unpack(f'{self.endian_flag}b',self.read(1))[0]
+        return self.structs['b'].unpack(self.read(1))[0]
 
     def read_UInt8(self) -> int:
-        return struct.unpack(f'{self.endian_flag}B',self.read(1))[0]
+        return self.structs['B'].unpack(self.read(1))[0]
 
     def read_Int16(self) -> int:
-        return struct.unpack(f'{self.endian_flag}h',self.read(2))[0]
+        return self.structs['h'].unpack(self.read(2))[0]
     
     def read_UInt16(self) -> int:
-        return struct.unpack(f'{self.endian_flag}H',self.read(2))[0]
+        return self.structs['H'].unpack(self.read(2))[0]
 
     def read_Int32(self) -> int:
-        return struct.unpack(f'{self.endian_flag}i',self.read(4))[0]
+        return self.structs['i'].unpack(self.read(4))[0]
     
     def read_UInt32(self) -> int:
-        return struct.unpack(f'{self.endian_flag}I',self.read(4))[0]
+        return self.structs['I'].unpack(self.read(4))[0]
 
     def read_Int64(self) -> int:
-        return struct.unpack(f'{self.endian_flag}q',self.read(8))[0]
+        return self.structs['q'].unpack(self.read(8))[0]
     
     def read_UInt64(self) -> int:
-        return struct.unpack(f'{self.endian_flag}Q',self.read(8))[0]
+        return self.structs['Q'].unpack(self.read(8))[0]
 
     def read_string(self, encoding : str, size : int) -> str:
         return self.read(size).decode(encoding)
     
     def read_utf16_until_null(self) -> str:
-        output = ""
-        char = self.read(2).decode('utf-16')
-        while char not in ["\x00", ""]:
-            output += char
-            char = self.read(2).decode('utf-16')
-        assert char != ""
-        return output
+        start = self.tell()
+        end = find_utf16_null(self.data, start)
+        assert end != -1, "EOF reached"
+        self.seek(end + 2)
+        return self.data[start:end].decode('utf-16')
+
+    def read_record(self, schema : RecordSchema):
+        return schema.unpack(self.read(schema.size))
+
+    def read_records(self, schema : RecordSchema, count : int) -> list:
+        return list(schema.iter_unpack(self.read(schema.size * count), 0, count))
 
     def align(self, alignment : int):
         mod = self.tell() % alignment
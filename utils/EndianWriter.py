@@ -1,4 +1,5 @@
 import struct
+from .RecordSchema import RecordSchema
 
 class EndianBinaryFileWriter:
     def __init__(self,filepath : str, endianness : str = 'little'):
@@ -22,32 +23,111 @@ class EndianBinaryFileWriter:
             self.endian_flag = '>'
         else:
             raise Exception(r"Unknown endianness : should be 'little' or 'big'")
+        self.structs = {fmt : struct.Struct(self.endian_flag + fmt) for fmt in "bBhHiIqQ"}
 
     def write_Int8(self,value: int):
-        self.file.write(struct.pack(f'{self.endian_flag}b',value))
+        self.file.write(self.structs['b'].pack(value))
 
     def write_UInt8(self,value: int):
-        self.file.write(struct.pack(f'{self.endian_flag}B',value))
+        self.file.write(self.structs['B'].pack(value))
 
     def write_Int16(self,value: int):
-        self.file.write(struct.pack(f'{self.endian_flag}h',value))
+        self.file.write(self.structs['h'].pack(value))
     
     def write_UInt16(self,value: int):
-        self.file.write(struct.pack(f'{self.endian_flag}H',value))
+        self.file.write(self.structs['H'].pack(value))
 
     def write_Int32(self,value: int):
-        self.file.write(struct.pack(f'{self.endian_flag}i',value))
+        self.file.write(self.structs['i'].pack(value))
 
     def write_UInt32(self,value: int):
-        self.file.write(struct.pack(f'{self.endian_flag}I',value))
+        self.file.write(self.structs['I'].pack(value))
 
     def write_Int64(self,value: int):
-        self.file.write(struct.pack(f'{self.endian_flag}q',value))
+        self.file.write(self.structs['q'].pack(value))
 
     def write_UInt64(self,value: int):
-        self.file.write(struct.pack(f'{self.endian_flag}Q',value))
+        self.file.write(self.structs['Q'].pack(value))
+
+    def write_record(self, schema : RecordSchema, *values, **fields):
+        self.file.write(schema.pack(*values, **fields))
+
+    def pad(self,alignment: int):
+        mod = self.tell() % alignment
+        if mod != 0:
+            self.write(bytes(alignment - mod))
+
+class EndianBinaryBufferWriter:
+    # in-memory counterpart of EndianBinaryStreamReader: seeking back to patch offsets doesn't cost any syscall,
+    # and the whole output is written to disk at once with save
+    def __init__(self, endianness : str = 'little'):
+        self.set_endianness(endianness)
+        self.buffer = bytearray()
+        self.pos = 0
+
+    def set_endianness(self, endianness : str):
+        if endianness == 'little':
+            self.endian_flag = '<'
+        elif endianness == 'big':
+            self.endian_flag = '>'
+        else:
+            raise Exception(r"Unknown endianness : should be 'little' or 'big'")
+        self.structs = {fmt : struct.Struct(self.endian_flag + fmt) for fmt in "bBhHiIqQ"}
+
+    def write(self, data : bytes):
+        if self.pos > len(self.buffer):
+            self.buffer += bytes(self.pos - len(self.buffer))
+        self.buffer[self.pos:self.pos + len(data)] = data
+        self.pos += len(data)
+
+    def tell(self) -> int:
+        return self.pos
+
+    def seek(self, offset : int, whence : int = 0):
+        if whence == 0:
+            self.pos = offset
+        elif whence == 1:
+            self.pos += offset
+        elif whence == 2:
+            self.pos = len(self.buffer) + offset
+        else:
+            raise Exception(f"Invalid whence: {whence}")
+
+    def getvalue(self) -> bytes:
+        return bytes(self.buffer)
+
+    def save(self, filepath : str):
+        with open(filepath, mode='wb') as f:
+            f.write(self.buffer)
+
+    def write_Int8(self,value: int):
+        self.write(self.structs['b'].pack(value))
+
+    def write_UInt8(self,value: int):
+        self.write(self.structs['B'].pack(value))
+
+    def write_Int16(self,value: int):
+        self.write(self.structs['h'].pack(value))
+
+    def write_UInt16(self,value: int):
+        self.write(self.structs['H'].pack(value))
+
+    def write_Int32(self,value: int):
+        self.write(self.structs['i'].pack(value))
+
+    def write_UInt32(self,value: int):
+        self.write(self.structs['I'].pack(value))
+
+    def write_Int64(self,value: int):
+        self.write(self.structs['q'].pack(value))
+
+    def write_UInt64(self,value: int):
+        self.write(self.structs['Q'].pack(value))
+
+    def write_record(self, schema : RecordSchema, *values, **fields):
+        self.write(schema.pack(*values, **fields))
 
     def pad(self,alignment: int):
         mod = self.tell() % alignment
         if mod != 0:
-            self.write(bytes(alignment - mod))
\ No newline at end of file
+            self.write(bytes(alignment - mod))
@@ -0,0 +1,154 @@
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+class Trace:
+    # time spent in each phase of a build (parse, decompress, compress, write...), summed over the threads running it.
+    # With record_events, every timed section is also kept as a Chrome trace event: saved traces open in Perfetto
+    # or chrome://tracing. perf_counter is system-wide on Linux and Windows, so events of worker processes line up
+    def __init__(self, record_events : bool = False):
+        self.record_events = record_events
+        self.phases : dict[str, list] = {} # name -> [seconds, count, bytes]
+        self.events : list[dict] = []
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name : str, size : int = 0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter(), size)
+
+    def add(self, name : str, start : float, end : float, size : int = 0):
+        with self.lock:
+            phase = self.phases.setdefault(name, [0.0, 0, 0])
+            phase[0] += end - start
+            phase[1] += 1
+            phase[2] += size
+            if self.record_events:
+                self.events.append({"name" : name, "ph" : "X", "ts" : start * 1e6, "dur" : (end - start) * 1e6,
+                                    "pid" : os.getpid(), "tid" : threading.get_ident(), "args" : {"bytes" : size}})
+
+    def collect(self) -> tuple[dict, list]:
+        # takes the timings recorded so far, used to send them back from a worker process
+        with self.lock:
+            phases, events = self.phases, self.events
+            self.phases, self.events = {}, []
+        return phases, events
+
+    def merge(self, phases : dict, events : list):
+        with self.lock:
+            for name, (seconds, count, size) in phases.items():
+                phase = self.phases.setdefault(name, [0.0, 0, 0])
+                phase[0] += seconds
+                phase[1] += count
+                phase[2] += size
+            self.events += events
+
+    def summary(self) -> str:
+        lines = ["Phase timings (summed over threads and processes):"]
+        for name, (seconds, count, size) in sorted(self.phases.items(), key = lambda item: -item[1][0]):
+            line = f"  {name:12} {seconds:9.3f} s {count:8} calls"
+            if size:
+                line += f" {size / 2**20:10.1f} MiB"
+                if seconds > 0:
+                    line += f" {size / 2**20 / seconds:8.1f} MiB/s"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def save(self, filepath : str):
+        phases = {name : {"seconds" : seconds, "count" : count, "bytes" : size} for name, (seconds, count, size) in self.phases.items()}
+        with open(filepath, 'w', encoding = 'utf-8') as f:
+            json.dump({"phases" : phases, "traceEvents" : self.events, "displayTimeUnit" : "ms"}, f)
+
+TRACE = Trace()
+
+class Progress:
+    # a single progress line with the throughput and remaining time, refreshed at most every `interval` seconds
+    # instead of a line per file. Outside of a terminal the line is printed less often, as a new line each time
+    def __init__(self, action : str, total_files : int, total_bytes : int = 0, interval : float = 0.5, verbose : bool = False, stream = None):
+        self.action = action
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.verbose = verbose
+        self.stream = stream if stream is not None else sys.stdout
+        self.tty = self.stream.isatty()
+        self.interval = interval if self.tty else max(interval, 5.0)
+        self.files = 0
+        self.bytes = 0
+        self.start = time.perf_counter()
+        self.last_report = self.start
+        self.line_length = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def update(self, size : int = 0, files : int = 1, item : str = None):
+        with self.lock:
+            self.files += files
+            self.bytes += size
+            if self.verbose and item is not None:
+                self.write_line(f"{self.action}ed {item}")
+            now = time.perf_counter()
+            if now - self.last_report >= self.interval:
+                self.last_report = now
+                self.report(now)
+
+    def print(self, message : str):
+        with self.lock:
+            self.write_line(message)
+
+    def write_line(self, message : str):
+        if self.tty and self.line_length:
+            self.stream.write("\r" + " " * self.line_length + "\r")
+            self.line_length = 0
+        self.stream.write(message + "\n")
+
+    def report(self, now : float):
+        elapsed = now - self.start
+        line = f"{self.action}ing: {self.files}/{self.total_files} files"
+        if self.total_bytes:
+            line += f", {self.bytes / 2**20:.1f}/{self.total_bytes / 2**20:.1f} MiB"
+        line += f", {self.bytes / 2**20 / elapsed:.1f} MiB/s, {self.files / elapsed:.0f} files/s"
+        # remaining time estimated from the bytes when their total is known, the number of files otherwise
+        done = self.bytes / self.total_bytes if self.total_bytes else self.files / max(self.total_files, 1)
+        if 0 < done < 1:
+            line += f", ETA {elapsed * (1 - done) / done:.0f} s"
+        if self.tty:
+            self.stream.write("\r" + line.ljust(self.line_length))
+            self.line_length = len(line)
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+    def close(self):
+        with self.lock:
+            elapsed = max(time.perf_counter() - self.start, 1e-9)
+            self.write_line(f"{self.action}ed {self.files}/{self.total_files} files ({self.bytes / 2**20:.1f} MiB) in {elapsed:.2f} s, "
+                            f"{self.bytes / 2**20 / elapsed:.1f} MiB/s, {self.files / elapsed:.0f} files/s")
+            self.stream.flush()
+
+@contextlib.contextmanager
+def profile(enabled : bool = True, limit : int = 30):
+    # cProfile of the calling thread only: work done by pool threads or processes shows up as waiting time,
+    # the phase timings of TRACE cover it
+    if not enabled:
+        yield
+        return
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(limit)
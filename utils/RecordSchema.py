@@ -0,0 +1,37 @@
+import struct
+from collections import namedtuple
+
+class RecordSchema:
+    # fixed-size binary record described by a list of (name, struct format) fields, compiled once into a struct.Struct.
+    # Fields named None are skipped when unpacking, which is meant for padding ('4x')
+    def __init__(self, name : str, fields : list[tuple[str, str]], endianness : str = 'little'):
+        if endianness == 'little':
+            endian_flag = '<'
+        elif endianness == 'big':
+            endian_flag = '>'
+        else:
+            raise Exception(r"Unknown endianness : should be 'little' or 'big'")
+        self.names = tuple(field_name for field_name, _ in fields if field_name is not None)
+        self.struct = struct.Struct(endian_flag + "".join(fmt for _, fmt in fields))
+        self.size = self.struct.size
+        self.record = namedtuple(name, self.names)
+        assert len(self.struct.unpack(bytes(self.size))) == len(self.names), "Each named field must hold exactly one value"
+
+    def unpack(self, data : bytes):
+        return self.record._make(self.struct.unpack(data))
+
+    def unpack_from(self, buffer, offset : int = 0):
+        return self.record._make(self.struct.unpack_from(buffer, offset))
+
+    def iter_unpack(self, buffer, offset : int = 0, count : int = None):
+        # decodes an array of records in a single pass
+        if count is None:
+            count = (len(buffer) - offset) // self.size
+        assert len(buffer) - offset >= self.size * count, "EOF reached"
+        return map(self.record._make, self.struct.iter_unpack(memoryview(buffer)[offset:offset + self.size * count]))
+
+    def pack(self, *values, **fields) -> bytes:
+        return self.struct.pack(*self.record(*values, **fields))
+
+    def pack_into(self, buffer, offset : int, *values, **fields):
+        self.struct.pack_into(buffer, offset, *self.record(*values, **fields))
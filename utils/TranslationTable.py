@@ -0,0 +1,123 @@
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+# A translation table holds the rows exported from one text file, the last column being the translation.
+# Tables are addressed by a root folder and a name such as "script/talkevent/mm_c2_0400_010.bin"
+
+class FileTable:
+    extension = ""
+
+    def get_path(self, root_dir : str, name : str) -> Path:
+        return Path(root_dir) / (name + self.extension)
+
+    def exists(self, root_dir : str, name : str) -> bool:
+        return self.get_path(root_dir, name).exists()
+
+    def write(self, root_dir : str, name : str, columns : list[str], rows : list[list[str]]):
+        self.write_file(self.get_path(root_dir, name), columns, rows)
+
+    def read(self, root_dir : str, name : str, column : str = "Translation") -> list[str]:
+        return self.read_file(self.get_path(root_dir, name), column)
+
+    def fingerprint(self, root_dir : str, name : str) -> str:
+        # changes whenever the table changes, None if it doesn't exist
+        path = self.get_path(root_dir, name)
+        if not path.is_file():
+            return None
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+class XlsxTable(FileTable):
+    # pandas and openpyxl take long to import, so they are only imported when an xlsx file is actually used
+    extension = ".xlsx"
+
+    def write_file(self, out_path : str, columns : list[str], rows : list[list[str]]):
+        import pandas as pd
+        df = pd.DataFrame(data=rows, columns=columns)
+        df.to_excel(out_path)
+
+    def read_file(self, in_path : str, column : str = "Translation") -> list[str]:
+        import pandas as pd
+        df = pd.read_excel(in_path, index_col = 0, dtype = str, na_filter=False)
+        return [str(data) for data in df[column]]
+
+class TsvTable(FileTable):
+    extension = ".tsv"
+
+    def write_file(self, out_path : str, columns : list[str], rows : list[list[str]]):
+        with open(out_path, 'w', encoding = 'utf-8', newline = '') as f:
+            writer = csv.writer(f, delimiter = '\t')
+            writer.writerow(columns)
+            writer.writerows(rows)
+
+    def read_file(self, in_path : str, column : str = "Translation") -> list[str]:
+        with open(in_path, 'r', encoding = 'utf-8', newline = '') as f:
+            reader = csv.reader(f, delimiter = '\t')
+            idx = next(reader).index(column)
+            return [row[idx] for row in reader]
+
+class JsonlTable(FileTable):
+    extension = ".jsonl"
+
+    def write_file(self, out_path : str, columns : list[str], rows : list[list[str]]):
+        with open(out_path, 'w', encoding = 'utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(dict(zip(columns, row)), ensure_ascii = False) + '\n')
+
+    def read_file(self, in_path : str, column : str = "Translation") -> list[str]:
+        with open(in_path, 'r', encoding = 'utf-8') as f:
+            return [json.loads(line)[column] for line in f if line.strip()]
+
+class SqliteTable:
+    # every table of the lang folder goes to a single database in the root folder.
+    # Only the Type, Original and Translation columns are stored
+    filename = "translation.sqlite"
+    columns = {"Type" : "type", "Original" : "original", "Translation" : "translation"}
+
+    def connect(self, root_dir : str) -> sqlite3.Connection:
+        os.makedirs(root_dir, exist_ok = True)
+        connection = sqlite3.connect(Path(root_dir) / self.filename, timeout = 60)
+        connection.execute("CREATE TABLE IF NOT EXISTS strings (file TEXT, idx INTEGER, type TEXT, original TEXT, translation TEXT, PRIMARY KEY (file, idx))")
+        return connection
+
+    def exists(self, root_dir : str, name : str) -> bool:
+        if not (Path(root_dir) / self.filename).is_file():
+            return False
+        connection = self.connect(root_dir)
+        found = connection.execute("SELECT 1 FROM strings WHERE file = ? LIMIT 1", (name,)).fetchone() is not None
+        connection.close()
+        return found
+
+    def write(self, root_dir : str, name : str, columns : list[str], rows : list[list[str]]):
+        rows = [dict(zip(columns, row)) for row in rows]
+        connection = self.connect(root_dir)
+        with connection:
+            connection.execute("DELETE FROM strings WHERE file = ?", (name,))
+            connection.executemany("INSERT INTO strings VALUES (?, ?, ?, ?, ?)",
+                                   [(name, idx, row.get("Type"), row["Original"], row["Translation"]) for idx, row in enumerate(rows)])
+        connection.close()
+
+    def read(self, root_dir : str, name : str, column : str = "Translation") -> list[str]:
+        connection = self.connect(root_dir)
+        values = [row[0] for row in connection.execute(f"SELECT {self.columns[column]} FROM strings WHERE file = ? ORDER BY idx", (name,))]
+        connection.close()
+        return values
+
+    def fingerprint(self, root_dir : str, name : str) -> str:
+        if not self.exists(root_dir, name):
+            return None
+        checksum = hashlib.sha1()
+        for translation in self.read(root_dir, name):
+            checksum.update(translation.encode('utf-8') + b"\x00")
+        return checksum.hexdigest()
+
+TABLE_FORMATS = {"xlsx" : XlsxTable, "tsv" : TsvTable, "jsonl" : JsonlTable, "sqlite" : SqliteTable}
+
+def get_table_format(name : str):
+    if name not in TABLE_FORMATS:
+        raise Exception(f"Unknown table format: {name}, should be one of {', '.join(TABLE_FORMATS)}")
+    return TABLE_FORMATS[name]()
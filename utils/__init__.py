@@ -1,4 +1,8 @@
 from .EndianReader import EndianBinaryFileReader, EndianBinaryStreamReader
-from .EndianWriter import EndianBinaryFileWriter
-from .utils import try_create_dir_from_filepath
-
+from .EndianWriter import EndianBinaryFileWriter, EndianBinaryBufferWriter
+from .RecordSchema import RecordSchema
+from .utils import try_create_dir_from_filepath, create_dirs_from_filepaths, pop_option, pop_flag, ordered_imap, copy_file_data
+from .BuildCache import BuildCache
+from .TranslationTable import get_table_format, TABLE_FORMATS
+from .Instrumentation import Trace, TRACE, Progress, profile
+from .Compression import Compressor, COMPRESSORS, DEFAULT_COMPRESSOR
@@ -1,6 +1,61 @@
 import os
+from collections import deque
 
 def try_create_dir_from_filepath(filepath : str):
     if os.path.exists(os.path.dirname(filepath)):
         return
     os.makedirs(os.path.dirname(filepath))
+
+def create_dirs_from_filepaths(filepaths : list):
+    for dirpath in {os.path.dirname(filepath) for filepath in filepaths}:
+        os.makedirs(dirpath, exist_ok = True)
+
+def pop_option(args : list, name : str, default = None):
+    if name not in args:
+        return default
+    idx = args.index(name)
+    assert idx + 1 < len(args), f"Missing value for {name}"
+    value = args[idx + 1]
+    del args[idx:idx + 2]
+    return value
+
+def ordered_imap(executor, func, iterable, window : int):
+    # like executor.map, but keeps at most `window` results in flight so memory stays bounded
+    pending = deque()
+    for item in iterable:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def copy_file_data(src, dst, offset : int, size : int, chunk_size : int = 0x1000000):
+    # copies size bytes of src starting at offset to the current position of dst, without going through
+    # Python memory when the OS allows it; bytes past the end of src are written as zeros
+    dst.flush()
+    dst_offset = dst.tell()
+    copied = 0
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while copied < size:
+                count = os.copy_file_range(src.fileno(), dst.fileno(), size - copied, offset + copied, dst_offset + copied)
+                if count == 0:
+                    break
+                copied += count
+        except OSError:
+            pass
+    src.seek(offset + copied)
+    dst.seek(dst_offset + copied)
+    while copied < size:
+        data = src.read(min(chunk_size, size - copied))
+        if not data:
+            break
+        dst.write(data)
+        copied += len(data)
+    dst.write(bytes(size - copied))
+
+def pop_flag(args : list, name : str) -> bool:
+    if name not in args:
+        return False
+    args.remove(name)
+    return True